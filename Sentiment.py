@@ -26,10 +26,16 @@ print("Files have been created: 'positive_words.csv', 'negative_words.csv', 'unc
 
 import os
 import pandas as pd
-import nltk
+from text_tokenizer import tokenize_fast, tokenize_nltk
+
+# Tokenizer to use: 'fast' (single compiled pattern, works offline) or 'nltk' (word_tokenize)
+# Run `python text_tokenizer.py <transcripts_dir>` to measure how closely they agree
+TOKENIZER = 'fast'
 
 # Download NLTK data
-nltk.download('punkt')
+if TOKENIZER == 'nltk':
+    import nltk
+    nltk.download('punkt')
 
 # Load the positive, negative, and risk word lists
 positive_words = pd.read_csv('positive_words.csv')['Word'].tolist()
@@ -42,16 +48,19 @@ negative_set = set(negative_words)
 risk_set = set(risk_words)
 
 def preprocess(text):
-    tokens = nltk.word_tokenize(text)
-    tokens = [word.lower() for word in tokens]
-    tokens = [word for word in tokens if word.isalpha()]
-    return tokens
+    if TOKENIZER == 'nltk':
+        return tokenize_nltk(text)
+    return tokenize_fast(text)
 
 def sentiment_analysis(text, positive_set, negative_set, risk_set):
-    tokens = preprocess(text)
-    positive_count = sum(1 for word in tokens if word in positive_set)
-    negative_count = sum(1 for word in tokens if word in negative_set)
-    risk_count = sum(1 for word in tokens if word in risk_set)
+    positive_count = negative_count = risk_count = 0
+    for word in preprocess(text):
+        if word in positive_set:
+            positive_count += 1
+        if word in negative_set:
+            negative_count += 1
+        if word in risk_set:
+            risk_count += 1
     sentiment_score = positive_count - negative_count
     return sentiment_score, positive_count, negative_count, risk_count
 
@@ -99,17 +108,23 @@ results_df.head()
 
 import os
 import re
+import time
 import pandas as pd
-from collections import Counter
 from math import ceil
-import json
-
-# Function to load unigrams from a txt file
-def load_unigrams(txt_file):
-    with open(txt_file, 'r') as file:
-        unigrams = file.read().splitlines()
-    print(f"Loaded {len(unigrams)} unigrams.")
-    return unigrams
+from keyword_matcher import count_matches, count_word_matches
+from transcript_reader import iter_words
+from corpus_cache import build_corpus_cache, count_matcher_hits
+from checkpoint_journal import journal_key, transcript_stamps, load_journal, open_journal, append_records
+from panel_store import join_scores, read_panel, write_panel_columns
+from dictionary_registry import load_dictionary
+from run_metrics import new_metrics, timed, record_document, report_progress, format_summary, write_metrics, profiled
+
+# Function to load unigrams from a txt file, or by list name from the bundled 'unigrams .zip',
+# as a compiled dictionary read ready-built from dictionary_cache_dir when it was compiled before
+def load_unigrams(txt_file, dictionary_cache_dir=None):
+    dictionary = load_dictionary(txt_file, dictionary_cache_dir)
+    print(f"Loaded {dictionary['size']} unigrams.")
+    return dictionary
 
 # Function to clean the text data
 def clean_text(text):
@@ -118,12 +133,9 @@ def clean_text(text):
     return cleaned_text
 
 # Function to count unigram occurrences in a text
-def count_unigrams(text, unigrams):
-    # Use regular expressions to find unigrams
-    unigram_counts = Counter()
-    for unigram in unigrams:
-        unigram_counts[unigram] = len(re.findall(r'\b' + re.escape(unigram) + r'\b', text))
-    return unigram_counts
+def count_unigrams(text, matcher):
+    # One pass over the text against the prebuilt keyword index
+    return count_matches(text, matcher)
 
 # Function to calculate equal-weighted exposure
 def calculate_equal_weighted_exposure(unigram_counts, total_unigrams):
@@ -134,14 +146,16 @@ def calculate_equal_weighted_exposure(unigram_counts, total_unigrams):
     return exposure
 
 # Function to process a single file and calculate exposure
-def process_file(transcript_file, unigrams):
-    # Load and clean the transcript
-    with open(transcript_file, 'r', encoding='utf-8') as file:
-        transcript = file.read()
-    cleaned_transcript = clean_text(transcript)
-    
-    # Count unigram occurrences
-    unigram_counts = count_unigrams(cleaned_transcript, unigrams)
+def process_file(transcript_file, unigrams, matcher):
+    if matcher['patterns']:
+        # Keywords with spaces or punctuation are matched against the whole cleaned transcript
+        with open(transcript_file, 'r', encoding='utf-8') as file:
+            transcript = file.read()
+        cleaned_transcript = clean_text(transcript)
+        unigram_counts = count_unigrams(cleaned_transcript, matcher)
+    else:
+        # Count unigram occurrences while streaming the transcript in fixed-size chunks
+        unigram_counts = count_word_matches(iter_words(transcript_file), matcher)
     
     # Calculate exposure
     exposure = calculate_equal_weighted_exposure(unigram_counts, len(unigrams))
@@ -149,85 +163,79 @@ def process_file(transcript_file, unigrams):
     return exposure
 
 # Function to process a batch of transcripts
-def process_batch(directory_path, unigrams, batch_files):
-    exposures = []
+def process_batch(directory_path, unigrams, matcher, batch_files, metrics=None):
+    if metrics is None:
+        metrics = new_metrics()
+    exposures = {}
     for filename in batch_files:
         transcript_file = os.path.join(directory_path, filename)
-        print(f"Processing file: {transcript_file}")
-        exposure = process_file(transcript_file, unigrams)
-        exposures.append(exposure)
-        print(f"Exposure for {filename}: {exposure}")
+        start = time.perf_counter()
+        with timed(metrics, 'score'):
+            exposure = process_file(transcript_file, unigrams, matcher)
+        record_document(metrics, filename, time.perf_counter() - start)
+        exposures[filename] = exposure
     return exposures
 
-# Function to save progress to a checkpoint file
-def save_checkpoint(checkpoint_file, batch_number, exposures):
-    checkpoint_data = {
-        'batch_number': batch_number,
-        'exposures': exposures
-    }
-    with open(checkpoint_file, 'w') as file:
-        json.dump(checkpoint_data, file)
-    print(f"Checkpoint saved at batch {batch_number}")
-
-# Function to load progress from a checkpoint file
-def load_checkpoint(checkpoint_file):
-    if os.path.exists(checkpoint_file):
-        with open(checkpoint_file, 'r') as file:
-            checkpoint_data = json.load(file)
-        print(f"Resuming from batch {checkpoint_data['batch_number']}")
-        return checkpoint_data['batch_number'], checkpoint_data['exposures']
-    else:
-        return 0, []
-
 # Main function to process all transcripts in batches and update the Excel file
-def main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=100):
+def main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=100, cache_dir=None, metrics_file=None, profile_dir=None, dictionary_cache_dir=None):
+    metrics = new_metrics()
+
     # Load unigrams
-    unigrams = load_unigrams(unigram_file)
+    dictionary = load_unigrams(unigram_file, dictionary_cache_dir)
+    unigrams = dictionary['unigrams']
+    matcher = dictionary['matcher']
     
     # Read the input Excel file
-    df = pd.read_excel(input_excel)
+    df = read_panel(input_excel)
     
     # Ensure the number of transcripts matches the number of rows in the DataFrame
     txt_files = sorted([filename for filename in os.listdir(directory_path) if filename.endswith('.txt')])
     if len(txt_files) != len(df):
         raise ValueError("The number of transcript files does not match the number of rows in the Excel file.")
     
-    # Start from batch 1
-    start_batch = 0
-    all_exposures = []
-
-    # Split files into batches
-    num_batches = ceil(len(txt_files) / batch_size)
-    
-    for i in range(start_batch, num_batches):
-        batch_files = txt_files[i * batch_size:(i + 1) * batch_size]
-        print(f"Processing batch {i + 1} of {num_batches}")
-        batch_exposures = process_batch(directory_path, unigrams, batch_files)
-        all_exposures.extend(batch_exposures)
+    # Score straight from the pre-tokenized corpus when a cache directory is given
+    if cache_dir is not None:
+        cache = build_corpus_cache(directory_path, cache_dir)
+        hit_counts = count_matcher_hits(cache, matcher)
+        all_exposures = {filename: calculate_equal_weighted_exposure({'hits': count}, len(unigrams)) for filename, count in zip(cache['filenames'], hit_counts.tolist())}
+    else:
+        # Resume from the checkpoint journal, skipping transcripts already scored and unchanged since
+        run_key = journal_key('risk_sentiment', unigrams)
+        stamps = transcript_stamps(directory_path, txt_files)
+        all_exposures = load_journal(checkpoint_file, run_key, stamps)
+        remaining_files = [filename for filename in txt_files if filename not in all_exposures]
+
+        # Split files into batches
+        num_batches = ceil(len(remaining_files) / batch_size)
         
-        # Save progress after each batch
-        save_checkpoint(checkpoint_file, i + 1, all_exposures)
-    
-    # Ensure the number of exposures matches the number of rows in the DataFrame
-    if len(all_exposures) != len(df):
-        raise ValueError("The number of exposures calculated does not match the number of rows in the DataFrame.")
+        with open_journal(checkpoint_file, run_key) as journal, profiled(profile_dir, 'main'):
+            for i in range(num_batches):
+                batch_files = remaining_files[i * batch_size:(i + 1) * batch_size]
+                batch_exposures = process_batch(directory_path, unigrams, matcher, batch_files, metrics)
+                all_exposures.update(batch_exposures)
+                
+                # Save progress after each batch
+                with timed(metrics, 'journal', len(batch_exposures)):
+                    append_records(journal, batch_exposures, stamps)
+                report_progress(metrics)
     
     # Update the DataFrame with the calculated exposures
-    df['risk_sentiment'] = all_exposures
+    join_scores(df, all_exposures, 'risk_sentiment')
     
     # Save the updated DataFrame to a new Excel file
-    df.to_excel(output_excel, index=False)
+    with timed(metrics, 'write'):
+        write_panel_columns(df, output_excel, ['risk_sentiment'])
     print(f"Data saved to {output_excel}")
+    print(format_summary(metrics))
+    if metrics_file is not None:
+        write_metrics(metrics, metrics_file)
 
 if __name__ == "__main__":
     directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'  # Update with your JSON folder path
     unigram_file = r'/Users/mikiokilo/Downloads/uncertainty_words.txt'  # Update with your unigram txt file path
     input_excel = r'/Users/mikiokilo/Downloads/OUTPUT_FILLED.xlsx'  # Input Excel file path
     output_excel = r'/Users/mikiokilo/Downloads/OUTPUT_FILLED3.xlsx'  # Output Excel file path
-    checkpoint_file = r'/Users/mikiokilo/Downloads/checkpoint.json'  # Checkpoint file path
-
-    # Remove the checkpoint file to start from scratch
-    if os.path.exists(checkpoint_file):
-        os.remove(checkpoint_file)
+    checkpoint_file = r'/Users/mikiokilo/Downloads/checkpoint_sentiment.jsonl'  # Checkpoint journal path
 
+    # The run resumes from the checkpoint file; edited or removed transcripts are re-scored or dropped
     main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=100)
@@ -1,159 +1,221 @@
-import os
-import re
-import pandas as pd
-from collections import Counter
-import math
-import json
-from concurrent.futures import ProcessPoolExecutor, as_completed
-import time
-
-# Function to load unigrams from a txt file
-def load_unigrams(txt_file):
-    with open(txt_file, 'r') as file:
-        unigrams = file.read().splitlines()
-    print(f"Loaded {len(unigrams)} unigrams.")
-    return set(unigrams)  # Using set for faster lookups
-
-# Function to clean the text data
-def clean_text(text):
-    cleaned_text = re.sub(r'\s+', ' ', text)
-    return cleaned_text
-
-# Function to count unigram occurrences in a text
-def count_unigrams(text, unigrams):
-    words = text.split()
-    total_words = len(words)
-    unigram_counts = Counter(words)
-    filtered_counts = {unigram: unigram_counts[unigram] for unigram in unigrams if unigram in unigram_counts}
-    return filtered_counts, total_words
-
-# Function to calculate Term Frequency (TF)
-def calculate_tf(unigram_counts, total_words):
-    tf_scores = {unigram: count / total_words for unigram, count in unigram_counts.items()}
-    return tf_scores
-
-# Function to calculate Inverse Document Frequency (IDF)
-def calculate_idf(transcript_files, unigrams):
-    N = len(transcript_files)
-    idf_scores = {}
-    unigram_doc_count = Counter()
-
-    for transcript_file in transcript_files:
-        with open(transcript_file, 'r', encoding='utf-8') as file:
-            transcript = file.read()
-        cleaned_transcript = clean_text(transcript)
-        words = set(cleaned_transcript.split())
-        for unigram in unigrams:
-            if unigram in words:
-                unigram_doc_count[unigram] += 1
-
-    for unigram in unigrams:
-        if unigram_doc_count[unigram] > 0:
-            idf_scores[unigram] = math.log(N / unigram_doc_count[unigram])
-        else:
-            idf_scores[unigram] = 0
-    return idf_scores
-
-# Function to calculate TF-IDF
-def calculate_tfidf(tf_scores, idf_scores):
-    tfidf_scores = {unigram: tf * idf_scores[unigram] for unigram, tf in tf_scores.items()}
-    return tfidf_scores
-
-# Function to save progress to a checkpoint file
-def save_checkpoint(checkpoint_file, batch_number, exposures):
-    checkpoint_data = {
-        'batch_number': batch_number,
-        'exposures': exposures
-    }
-    with open(checkpoint_file, 'w') as file:
-        json.dump(checkpoint_data, file)
-    print(f"Checkpoint saved at batch {batch_number}")
-
-# Function to load progress from a checkpoint file
-def load_checkpoint(checkpoint_file):
-    if os.path.exists(checkpoint_file):
-        with open(checkpoint_file, 'r') as file:
-            checkpoint_data = json.load(file)
-        print(f"Resuming from batch {checkpoint_data['batch_number']}")
-        return checkpoint_data['batch_number'], checkpoint_data['exposures']
-    else:
-        return 0, []
-
-# Function to process a single file and calculate exposure
-def process_file(transcript_file, unigrams, idf_scores):
-    try:
-        with open(transcript_file, 'r', encoding='utf-8') as file:
-            transcript = file.read()
-        cleaned_transcript = clean_text(transcript)
-        unigram_counts, total_words = count_unigrams(cleaned_transcript, unigrams)
-        tf_scores = calculate_tf(unigram_counts, total_words)
-        tfidf_scores = calculate_tfidf(tf_scores, idf_scores)
-        total_tfidf = sum(tfidf_scores.values())
-        normalized_tfidf = total_tfidf / len(unigrams)
-        return round(normalized_tfidf, 3)
-    except Exception as e:
-        print(f"Error processing file {transcript_file}: {e}")
-        return 0
-
-# Function to process a batch of transcripts in parallel
-def process_batch_parallel(directory_path, unigrams, idf_scores, batch_files):
-    exposures = []
-    with ProcessPoolExecutor() as executor:
-        futures = {executor.submit(process_file, os.path.join(directory_path, filename), unigrams, idf_scores): filename for filename in batch_files}
-        for future in as_completed(futures):
-            filename = futures[future]
-            try:
-                exposure = future.result()
-                exposures.append(exposure)
-                print(f"Exposure for {filename}: {exposure}")
-            except Exception as exc:
-                print(f"Error processing file {filename}: {exc}")
-    return exposures
-
-# Main function to process all transcripts and calculate TF-IDF exposure
-def main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=20):  # Reduced batch size to 20
-    start_time = time.time()
-
-    unigrams = load_unigrams(unigram_file)
-    df = pd.read_excel(input_excel)
-    start_batch, all_exposures = load_checkpoint(checkpoint_file)
-    
-    transcript_files = [os.path.join(directory_path, filename) for filename in sorted(os.listdir(directory_path)) if filename.endswith('.txt')]
-    
-    if start_batch == 0:
-        idf_scores = calculate_idf(transcript_files, unigrams)
-        save_checkpoint('idf_scores.json', 0, idf_scores)
-    else:
-        with open('idf_scores.json', 'r') as file:
-            idf_scores = json.load(file)
-
-    num_batches = math.ceil(len(transcript_files) / batch_size)
-    
-    for i in range(start_batch, num_batches):
-        batch_start = i * batch_size
-        batch_end = batch_start + batch_size
-        batch_files = transcript_files[batch_start:batch_end]
-        print(f"Processing batch {i + 1} of {num_batches}")
-        batch_exposures = process_batch_parallel(directory_path, unigrams, idf_scores, batch_files)
-        all_exposures.extend(batch_exposures)
-        
-        save_checkpoint(checkpoint_file, i + 1, all_exposures)
-    
-    if len(all_exposures) != len(df):
-        raise ValueError("The number of exposures calculated does not match the number of rows in the DataFrame.")
-    
-    df['cc_expo_tfidf'] = all_exposures
-    df.to_excel(output_excel, index=False)
-    print(f"Data saved to {output_excel}")
-
-    end_time = time.time()
-    print(f"Total execution time: {end_time - start_time} seconds")
-
-if __name__ == "__main__":
-    directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'
-    unigram_file = r'/Users/mikiokilo/Downloads/general_unigrams.txt'
-    input_excel = r'/Users/mikiokilo/Downloads/output_with_new_columns.xlsx'
-    output_excel = r'/Users/mikiokilo/Downloads/Final_Exposure_Outputs/updated_output5.xlsx'
-    checkpoint_file = r'/Users/mikiokilo/Downloads/checkpoint.json'
-
-    main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=20)  # Reduced batch size
+import os
+import re
+from collections import Counter
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+from transcript_reader import iter_words
+from corpus_cache import build_corpus_cache, iter_token_counts
+from incremental_scoring import update_tfidf
+from panel_store import join_scores, read_panel, write_panel_columns
+from checkpoint_journal import journal_key, transcript_stamps, load_journal, open_journal, append_records
+from tfidf_matrix import build_count_matrix, build_vocab_matrix, select_keywords, calculate_exposures
+from dictionary_registry import load_dictionary
+from prefetch_reader import prefetch_files, iter_chunks, map_bounded
+from run_metrics import new_metrics, timed, record_document, record_queue_depth, merge_metrics, report_progress, format_summary, write_metrics, profiled
+
+# Function to load unigrams from a txt file, or by list name from the bundled 'unigrams .zip',
+# read ready-built from dictionary_cache_dir when the list was compiled before
+def load_unigrams(txt_file, dictionary_cache_dir=None):
+    dictionary = load_dictionary(txt_file, dictionary_cache_dir)
+    print(f"Loaded {dictionary['size']} unigrams.")
+    return dictionary['keywords']  # Using set for faster lookups
+
+# Function to clean the text data
+def clean_text(text):
+    cleaned_text = re.sub(r'\s+', ' ', text)
+    return cleaned_text
+
+# Function to count unigram occurrences in a text or a stream of words
+def count_unigrams(text, unigrams):
+    words = text.split() if isinstance(text, str) else text
+    unigram_counts = Counter(words)
+    total_words = sum(unigram_counts.values())
+    filtered_counts = {unigram: unigram_counts[unigram] for unigram in unigrams if unigram in unigram_counts}
+    return filtered_counts, total_words
+
+# Function to calculate Term Frequency (TF)
+def calculate_tf(unigram_counts, total_words):
+    tf_scores = {unigram: count / total_words for unigram, count in unigram_counts.items()}
+    return tf_scores
+
+# Function to calculate Inverse Document Frequency (IDF) from per-document keyword counts
+def calculate_idf_from_counts(document_counts, unigrams):
+    N = len(document_counts)
+    unigram_doc_count = Counter()
+    for unigram_counts in document_counts:
+        unigram_doc_count.update(unigram_counts.keys())
+    return {unigram: math.log(N / unigram_doc_count[unigram]) if unigram_doc_count[unigram] > 0 else 0 for unigram in unigrams}
+
+# Function to calculate TF-IDF
+def calculate_tfidf(tf_scores, idf_scores):
+    tfidf_scores = {unigram: tf * idf_scores[unigram] for unigram, tf in tf_scores.items()}
+    return tfidf_scores
+
+# Function to turn one document's keyword counts into its normalized TF-IDF exposure
+def calculate_exposure(unigram_counts, total_words, unigrams, idf_scores):
+    tf_scores = calculate_tf(unigram_counts, total_words)
+    tfidf_scores = calculate_tfidf(tf_scores, idf_scores)
+    total_tfidf = sum(tfidf_scores.values())
+    normalized_tfidf = total_tfidf / len(unigrams)
+    return round(normalized_tfidf, 3)
+
+# Function to read a single file once and record its keyword counts and length
+def count_file(transcript_file, unigrams):
+    try:
+        # The words are streamed in fixed-size chunks, so the transcript is never held whole
+        unigram_counts, total_words = count_unigrams(iter_words(transcript_file), unigrams)
+        return unigram_counts, total_words
+    except Exception as e:
+        print(f"Error processing file {transcript_file}: {e}")
+        return {}, 0
+
+# Function to read a transcript on a prefetch thread; a file that cannot be read counts as empty, as in count_file
+def read_transcript(transcript_file):
+    try:
+        with open(transcript_file, 'r', encoding='utf-8') as file:
+            return file.read()
+    except Exception as e:
+        print(f"Error processing file {transcript_file}: {e}")
+        return ''
+
+# Keyword set held by each worker process, loaded once by the pool initializer
+worker_unigrams = None
+worker_profile_dir = None
+
+# Function run once in every worker process when the pool starts; with a dictionary cache the
+# worker loads the compiled list the main process already wrote instead of receiving it pickled
+def init_worker(unigrams, profile_dir=None, unigram_file=None, dictionary_cache_dir=None):
+    global worker_unigrams, worker_profile_dir
+    worker_unigrams = unigrams if unigrams is not None else load_dictionary(unigram_file, dictionary_cache_dir)['keywords']
+    worker_profile_dir = profile_dir
+
+# Function to count a chunk of transcripts against the keyword set already loaded in the worker;
+# each item is a file path to stream, or a (path, text) pair already read by the prefetcher
+def count_files_in_worker(transcript_files):
+    results = []
+    metrics = new_metrics()
+    with profiled(worker_profile_dir):
+        for item in transcript_files:
+            # Reading, splitting and matching are one streamed pass, timed together as 'count'
+            start = time.perf_counter()
+            with timed(metrics, 'count'):
+                if isinstance(item, tuple):
+                    transcript_file, transcript = item
+                    unigram_counts, total_words = count_unigrams(transcript, worker_unigrams)
+                else:
+                    transcript_file = item
+                    unigram_counts, total_words = count_file(transcript_file, worker_unigrams)
+            record_document(metrics, os.path.basename(transcript_file), time.perf_counter() - start, total_words)
+            results.append((os.path.basename(transcript_file), unigram_counts, total_words))
+    return results, metrics
+
+# Function to count keywords for a stream of transcripts on the long-lived pool, yielding
+# each chunk's {filename: [counts, total_words]} as soon as its worker returns it
+def iter_counts_parallel(executor, directory_path, filenames, chunk_size=4, metrics=None, prefetch_threads=None):
+    if metrics is None:
+        metrics = new_metrics()
+    transcript_files = [os.path.join(directory_path, filename) for filename in filenames]
+    if prefetch_threads:
+        # Threads read ahead and hand whole buffers to the workers, at most a bounded number in flight
+        chunks = iter_chunks(prefetch_files(transcript_files, prefetch_threads, reader=read_transcript), chunk_size)
+        completed = map_bounded(executor, count_files_in_worker, chunks)
+    else:
+        chunks = [transcript_files[start:start + chunk_size] for start in range(0, len(transcript_files), chunk_size)]
+        futures = [executor.submit(count_files_in_worker, chunk) for chunk in chunks]
+        completed = ((future.result(), len(futures) - done) for done, future in enumerate(as_completed(futures), start=1))
+    # Results are keyed by file name, so completion order does not matter
+    for (results, worker_metrics), pending in completed:
+        record_queue_depth(metrics, pending)
+        merge_metrics(metrics, worker_metrics)
+        yield {filename: [unigram_counts, total_words] for filename, unigram_counts, total_words in results}
+
+# Function to count keywords for a batch of transcripts on the long-lived pool
+def process_batch_parallel(executor, directory_path, batch_files, chunk_size=4, metrics=None, prefetch_threads=None):
+    document_counts = {}
+    for chunk_counts in iter_counts_parallel(executor, directory_path, batch_files, chunk_size, metrics, prefetch_threads):
+        document_counts.update(chunk_counts)
+    return document_counts
+
+# Main function to process all transcripts and calculate TF-IDF exposure
+def main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=20, cache_dir=None, sparse_matrix=False, max_workers=None, chunk_size=4, incremental_dir=None, metrics_file=None, profile_dir=None, prefetch_threads=None, dictionary_cache_dir=None):  # Reduced batch size to 20
+    start_time = time.time()
+    metrics = new_metrics()
+
+    unigrams = load_unigrams(unigram_file, dictionary_cache_dir)
+    df = read_panel(input_excel)
+
+    # Incremental mode: only new or changed transcripts are read, document frequencies move by delta
+    if incremental_dir is not None:
+        all_exposures = update_tfidf(directory_path, incremental_dir, 'cc_expo_tfidf', unigrams)
+    # Vectorized mode: one sparse count matrix for the corpus, TF-IDF as array operations
+    elif sparse_matrix:
+        if cache_dir is not None:
+            cache = build_corpus_cache(directory_path, cache_dir)
+            vocab_counts, total_words = build_vocab_matrix(cache)
+            counts, _ = select_keywords(vocab_counts, cache['vocab'], unigrams)
+        else:
+            transcript_files = [os.path.join(directory_path, filename) for filename in sorted(os.listdir(directory_path)) if filename.endswith('.txt')]
+            counts, total_words, _ = build_count_matrix(transcript_files, unigrams)
+        filenames = cache['filenames'] if cache_dir is not None else [os.path.basename(transcript_file) for transcript_file in transcript_files]
+        all_exposures = dict(zip(filenames, calculate_exposures(counts, total_words, len(unigrams))))
+    # Score straight from the pre-tokenized corpus when a cache directory is given
+    elif cache_dir is not None:
+        cache = build_corpus_cache(directory_path, cache_dir)
+        document_counts = list(iter_token_counts(cache, unigrams))
+        idf_scores = calculate_idf_from_counts([unigram_counts for _, unigram_counts, _ in document_counts], unigrams)
+        all_exposures = {filename: calculate_exposure(unigram_counts, total_words, unigrams, idf_scores) for filename, unigram_counts, total_words in document_counts}
+    else:
+        # Each transcript is read once: its counts feed the document frequencies and are
+        # kept so the IDF-weighted exposures can be finalized without a second read
+        # The checkpoint journal holds the counts of transcripts already read, which are skipped;
+        # records of transcripts edited or removed since are left out, so N counts only current files
+        run_key = journal_key('cc_expo_tfidf', unigrams)
+        txt_files = [filename for filename in sorted(os.listdir(directory_path)) if filename.endswith('.txt')]
+        stamps = transcript_stamps(directory_path, txt_files)
+        all_counts = load_journal(checkpoint_file, run_key, stamps)
+        
+        remaining_files = [filename for filename in txt_files if filename not in all_counts]
+        
+        # One pool for the whole run; workers receive the keyword set once at start-up, or load it from the dictionary cache
+        initargs = (unigrams, profile_dir) if dictionary_cache_dir is None else (None, profile_dir, unigram_file, dictionary_cache_dir)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=initargs) as executor, open_journal(checkpoint_file, run_key) as journal:
+            # One stream over all remaining transcripts, so the read-ahead never drains at a batch boundary;
+            # counts are journaled as they arrive, with one fsync per batch_size transcripts
+            batch_counts = {}
+            for chunk_counts in iter_counts_parallel(executor, directory_path, remaining_files, chunk_size, metrics, prefetch_threads):
+                all_counts.update(chunk_counts)
+                batch_counts.update(chunk_counts)
+                if len(batch_counts) >= batch_size:
+                    with timed(metrics, 'journal', len(batch_counts)):
+                        append_records(journal, batch_counts, stamps)
+                    batch_counts = {}
+                report_progress(metrics)
+            if batch_counts:
+                with timed(metrics, 'journal', len(batch_counts)):
+                    append_records(journal, batch_counts, stamps)
+
+        with timed(metrics, 'weight', len(all_counts)):
+            idf_scores = calculate_idf_from_counts([unigram_counts for unigram_counts, _ in all_counts.values()], unigrams)
+            all_exposures = {filename: calculate_exposure(unigram_counts, total_words, unigrams, idf_scores) for filename, (unigram_counts, total_words) in all_counts.items()}
+    
+    # Join by transcript file name rather than by position
+    join_scores(df, all_exposures, 'cc_expo_tfidf')
+    with timed(metrics, 'write'):
+        write_panel_columns(df, output_excel, ['cc_expo_tfidf'])
+    print(f"Data saved to {output_excel}")
+    print(format_summary(metrics))
+    if metrics_file is not None:
+        write_metrics(metrics, metrics_file)
+
+    end_time = time.time()
+    print(f"Total execution time: {end_time - start_time} seconds")
+
+if __name__ == "__main__":
+    directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'
+    unigram_file = r'/Users/mikiokilo/Downloads/general_unigrams.txt'
+    input_excel = r'/Users/mikiokilo/Downloads/output_with_new_columns.xlsx'
+    output_excel = r'/Users/mikiokilo/Downloads/Final_Exposure_Outputs/updated_output5.xlsx'
+    checkpoint_file = r'/Users/mikiokilo/Downloads/checkpoint_tfidf.jsonl'
+
+    main(directory_path, unigram_file, input_excel, output_excel, checkpoint_file, batch_size=20)  # Reduced batch size
@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import platform
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dictionary_registry import load_keywords
+from text_tokenizer import tokenize_fast
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then not recorded
+    resource = None
+
+# Benchmark layout in the work directory:
+#   corpus_<docs>_<words>_<seed>/transcripts/*.txt - synthetic transcripts
+#   corpus_<docs>_<words>_<seed>/json/*.json       - matching call metadata, as in the JSON folder
+#   corpus_<docs>_<words>_<seed>/panel.parquet     - the firm-quarter panel the transcripts belong to
+#   benchmark_results.jsonl                         - one line per stage run, appended
+DOC_COUNTS = (1000, 10000, 100000)
+WORDS_PER_DOC = 3000
+SEED = 42
+# Share of words drawn from the climate keyword list, and from each sentiment list
+KEYWORD_DENSITY = 0.02
+SENTIMENT_DENSITY = 0.005
+SENTENCE_LENGTH = 18
+FILLER_WORDS = (
+    'the', 'we', 'our', 'and', 'to', 'of', 'in', 'a', 'that', 'is', 'for', 'this', 'on', 'with', 'as', 'year',
+    'quarter', 'you', 'it', 'are', 'have', 'be', 'at', 'from', 'by', 'was', 'revenue', 'growth', 'margin',
+    'customers', 'business', 'market', 'think', 'really', 'continue', 'expect', 'first', 'second', 'third',
+    'fourth', 'million', 'billion', 'percent', 'sales', 'operating', 'results', 'question', 'thank', 'next',
+    'line', 'guidance', 'cash', 'flow', 'over', 'about', 'some', 'more', 'also', 'very', 'good', "we're",
+    "it's", "don't", 'company', 'team', 'product', 'demand', 'pricing', 'cost', 'costs', 'investment'
+)
+SENTIMENT_WORDS = {
+    'positive_count': ('strong', 'improve', 'gain', 'success', 'achieve', 'benefit', 'progress', 'record'),
+    'negative_count': ('loss', 'decline', 'weak', 'challenge', 'difficult', 'adverse', 'impairment', 'fail'),
+    'risk_count': ('uncertain', 'risk', 'may', 'possible', 'depend', 'volatility', 'exposure', 'approximately')
+}
+STAGES = ('metadata', 'cleaning', 'equal_weighted', 'tfidf', 'sentiment', 'output')
+# The scoring stages run the exposure scripts' own scoring streams, as their main() does without the journal
+SCRIPTS = {'equal_weighted': 'EQUAL-WEIGHTED EXPOSURE.py', 'tfidf': 'TF-IDF EXPOSURE.py'}
+
+# Function to generate one transcript's text from its own seeded generator
+def generate_transcript(rng, words_per_doc, keywords, sentiment_words):
+    kinds = rng.random(words_per_doc)
+    words = np.array(FILLER_WORDS, dtype=object)[rng.integers(len(FILLER_WORDS), size=words_per_doc)]
+    keyword_mask = kinds < KEYWORD_DENSITY
+    words[keyword_mask] = keywords[rng.integers(len(keywords), size=keyword_mask.sum())]
+    sentiment_mask = (kinds >= KEYWORD_DENSITY) & (kinds < KEYWORD_DENSITY + SENTIMENT_DENSITY * len(SENTIMENT_WORDS))
+    words[sentiment_mask] = sentiment_words[rng.integers(len(sentiment_words), size=sentiment_mask.sum())]
+    # Sentence ends, so tokenizers see punctuation as in real calls
+    sentence_ends = np.arange(SENTENCE_LENGTH - 1, words_per_doc, SENTENCE_LENGTH)
+    words[sentence_ends] = [word + '.' for word in words[sentence_ends]]
+    return ' '.join(words)
+
+# Function to generate a seeded synthetic corpus, reusing it if it was generated before
+def generate_corpus(work_dir, num_docs, words_per_doc=WORDS_PER_DOC, seed=SEED):
+    corpus_dir = os.path.join(work_dir, f"corpus_{num_docs}_{words_per_doc}_{seed}")
+    panel_file = os.path.join(corpus_dir, 'panel.parquet')
+    if os.path.exists(panel_file):
+        return corpus_dir
+    transcripts_dir = os.path.join(corpus_dir, 'transcripts')
+    json_dir = os.path.join(corpus_dir, 'json')
+    os.makedirs(transcripts_dir, exist_ok=True)
+    os.makedirs(json_dir, exist_ok=True)
+    keywords = np.array(load_keywords('general_unigrams'), dtype=object)
+    sentiment_words = np.array([word for words in SENTIMENT_WORDS.values() for word in words], dtype=object)
+
+    rows = []
+    num_companies = max(num_docs // 40, 1)
+    for doc in range(num_docs):
+        rng = np.random.default_rng([seed, doc])
+        filename = f"{doc:08d}"
+        company_id = 1000 + doc % num_companies
+        company_name = f"Synthetic Holdings {doc % num_companies} Inc"
+        period = f"Q{doc % 4 + 1} {2005 + (doc // 4) % 18}"
+        with open(os.path.join(transcripts_dir, filename + '.txt'), 'w', encoding='utf-8') as file:
+            file.write(generate_transcript(rng, words_per_doc, keywords, sentiment_words))
+        with open(os.path.join(json_dir, filename + '.json'), 'w', encoding='utf-8') as file:
+            json.dump({'companyid': company_id, 'companyname': company_name, 'headline': f"{company_name}, {period} Earnings Call"}, file)
+        rows.append((os.path.join(transcripts_dir, filename + '.txt'), company_id, company_name, period))
+    pd.DataFrame(rows, columns=['file', 'company_id', 'company_name', 'earnings_call_period']).to_parquet(panel_file, index=False)
+    print(f"Generated {num_docs} transcripts of {words_per_doc} words in {corpus_dir}")
+    return corpus_dir
+
+# Function to import one of the exposure scripts, whose file names are not valid module names
+def load_script(stage):
+    name = f"{stage}_script"
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[stage]))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+# Function run once in every TF-IDF pool worker: import the script under the same name, then run its own initializer
+def init_tfidf_worker(unigrams):
+    load_script('tfidf').init_worker(unigrams)
+
+# Function to count sentiment words as Sentiment.py's sentiment_analysis does; the script itself
+# reads its word lists and scores a fixed directory on import, so only its tokenizer loop is repeated here
+def sentiment_counts(text, word_sets):
+    counts = dict.fromkeys(word_sets, 0)
+    for word in tokenize_fast(text):
+        for column, word_set in word_sets.items():
+            if word in word_set:
+                counts[column] += 1
+    return counts
+
+# Function to run one pipeline stage on a generated corpus
+def run_stage(stage, corpus_dir, max_workers=None):
+    transcripts_dir = os.path.join(corpus_dir, 'transcripts')
+    txt_files = sorted(filename for filename in os.listdir(transcripts_dir) if filename.endswith('.txt'))
+    panel = pd.read_parquet(os.path.join(corpus_dir, 'panel.parquet'))
+    if stage == 'metadata':
+        from company_info_extractor import extract_directory
+        extract_directory(os.path.join(corpus_dir, 'json'), os.path.join(corpus_dir, 'metadata.csv'))
+    elif stage == 'cleaning':
+        from cleaner import format_company_names
+        format_company_names(panel['company_name'])
+    elif stage == 'equal_weighted':
+        script = load_script(stage)
+        dictionary = script.load_unigrams('general_unigrams')
+        all_exposures = dict(script.iter_exposures(transcripts_dir, dictionary['unigrams'], dictionary['matcher'], txt_files))
+        if len(all_exposures) != len(txt_files):
+            raise RuntimeError(f"Equal-weighted scored {len(all_exposures)} of {len(txt_files)} transcripts.")
+    elif stage == 'tfidf':
+        script = load_script(stage)
+        unigrams = script.load_unigrams('general_unigrams')
+        all_counts = {}
+        # One stream over every transcript, as main() runs it; the journal writes are left out
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_tfidf_worker, initargs=(unigrams,)) as executor:
+            for chunk_counts in script.iter_counts_parallel(executor, transcripts_dir, txt_files):
+                all_counts.update(chunk_counts)
+        idf_scores = script.calculate_idf_from_counts([unigram_counts for unigram_counts, _ in all_counts.values()], unigrams)
+        all_exposures = {filename: script.calculate_exposure(unigram_counts, total_words, unigrams, idf_scores) for filename, (unigram_counts, total_words) in all_counts.items()}
+        if len(all_exposures) != len(txt_files):
+            raise RuntimeError(f"TF-IDF scored {len(all_exposures)} of {len(txt_files)} transcripts.")
+    elif stage == 'sentiment':
+        word_sets = {column: set(words) for column, words in SENTIMENT_WORDS.items()}
+        for filename in txt_files:
+            with open(os.path.join(transcripts_dir, filename), 'r', encoding='utf-8') as file:
+                sentiment_counts(file.read(), word_sets)
+    elif stage == 'output':
+        from panel_store import write_panel_columns
+        rng = np.random.default_rng(SEED)
+        for column in ('cc_expo_ew', 'cc_expo_tfidf', 'risk_count'):
+            panel[column] = rng.random(len(panel)).round(3)
+        write_panel_columns(panel, os.path.join(corpus_dir, 'output_panel'), ['cc_expo_ew', 'cc_expo_tfidf', 'risk_count'])
+    else:
+        raise ValueError(f"Unknown stage {stage}, expected one of {STAGES}.")
+    return len(panel)
+
+# Function to read the peak resident set size of this process and its finished children, in MB
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+# Function run in a fresh process per stage, so each stage's peak RSS is its own
+def timed_stage(stage, corpus_dir, max_workers, queue):
+    start = time.perf_counter()
+    num_docs = run_stage(stage, corpus_dir, max_workers)
+    queue.put((num_docs, time.perf_counter() - start, peak_rss_mb()))
+
+# Function to benchmark every stage at each corpus size and append the results to a JSON lines file
+def run_benchmark(work_dir, doc_counts=DOC_COUNTS, words_per_doc=WORDS_PER_DOC, stages=STAGES, max_workers=None, seed=SEED):
+    os.makedirs(work_dir, exist_ok=True)
+    results_file = os.path.join(work_dir, 'benchmark_results.jsonl')
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for num_docs in doc_counts:
+        corpus_dir = generate_corpus(work_dir, num_docs, words_per_doc, seed)
+        for stage in stages:
+            queue = context.Queue()
+            process = context.Process(target=timed_stage, args=(stage, corpus_dir, max_workers, queue))
+            process.start()
+            docs, seconds, peak_rss = queue.get()
+            process.join()
+            result = {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stage': stage, 'docs': docs, 'words_per_doc': words_per_doc,
+                'seed': seed, 'seconds': round(seconds, 3), 'docs_per_sec': round(docs / seconds, 1), 'peak_rss_mb': peak_rss and round(peak_rss, 1),
+                'max_workers': max_workers or os.cpu_count(), 'python': platform.python_version(), 'platform': platform.platform()
+            }
+            with open(results_file, 'a') as file:
+                file.write(json.dumps(result) + '\n')
+            print(f"{stage:>15} {docs:>7} docs {seconds:>9.2f}s {result['docs_per_sec']:>10.1f} docs/s  peak RSS {result['peak_rss_mb']} MB")
+            results.append(result)
+    print(f"Results appended to {results_file}")
+    return results
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py <work_dir> [doc_counts, e.g. 1000,10000,100000] [words_per_doc] [stages, e.g. tfidf,output]
+    work_dir = sys.argv[1]
+    doc_counts = [int(count) for count in sys.argv[2].split(',')] if len(sys.argv) > 2 else DOC_COUNTS
+    words_per_doc = int(sys.argv[3]) if len(sys.argv) > 3 else WORDS_PER_DOC
+    stages = sys.argv[4].split(',') if len(sys.argv) > 4 else STAGES
+    run_benchmark(work_dir, doc_counts, words_per_doc, stages)
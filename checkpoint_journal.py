@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+
+# A journal is a text file of JSON lines: a header line identifying the run
+# (e.g. the keyword list), then one [filename, result, [size, mtime]] record per
+# scored transcript. Records are only ever appended, so saving a batch costs the
+# same at the end of a run as at the start. The size and mtime let a later run
+# re-score transcripts edited since, and drop those no longer in the directory.
+# The run key is part of the journal's file name, so scorers and keyword lists given
+# the same checkpoint path each keep their own journal instead of replacing another's.
+
+# Function to derive a run key from the score column and the keyword list it is computed from
+def journal_key(column, unigrams):
+    return hashlib.sha1('\n'.join([column] + sorted(set(unigrams))).encode('utf-8')).hexdigest()
+
+# Function to name the journal of one run, e.g. checkpoint.jsonl -> checkpoint-<run key>.jsonl
+def journal_path(journal_file, run_key):
+    root, extension = os.path.splitext(journal_file)
+    return f"{root}-{run_key[:16]}{extension}"
+
+# Function to take the size and mtime of every transcript before it is scored
+def transcript_stamps(directory_path, filenames):
+    stamps = {}
+    for filename in filenames:
+        stat = os.stat(os.path.join(directory_path, filename))
+        stamps[filename] = [stat.st_size, stat.st_mtime]
+    return stamps
+
+# Function to load the results already recorded in a journal; with stamps, only records
+# of transcripts still present and unchanged since they were scored are kept
+def load_journal(journal_file, run_key, stamps=None):
+    journal_file = journal_path(journal_file, run_key)
+    results = {}
+    if not os.path.exists(journal_file):
+        return results
+    with open(journal_file, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    try:
+        header = json.loads(lines[0]) if lines else {}
+    except ValueError:
+        header = {}
+    if header.get('run_key') != run_key:
+        raise ValueError(f"Checkpoint {journal_file} belongs to a different score or keyword list; move it away to start from scratch.")
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A run killed mid-write can leave a partial line; that file is simply re-scored
+            continue
+        filename, result = record[0], record[1]
+        if stamps is not None and (len(record) < 3 or stamps.get(filename) != record[2]):
+            # Removed or edited since it was scored; a later record may still be current
+            results.pop(filename, None)
+            continue
+        results[filename] = result
+    print(f"Resuming from {journal_file} with {len(results)} transcripts already scored")
+    return results
+
+# Function to open a journal for appending, writing its header if it is new
+def open_journal(journal_file, run_key):
+    journal_file = journal_path(journal_file, run_key)
+    is_new = not os.path.exists(journal_file) or os.path.getsize(journal_file) == 0
+    ends_cleanly = True
+    if not is_new:
+        with open(journal_file, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            ends_cleanly = file.read(1) == b'\n'
+    journal = open(journal_file, 'a', encoding='utf-8')
+    if is_new:
+        journal.write(json.dumps({'run_key': run_key}) + '\n')
+    elif not ends_cleanly:
+        journal.write('\n')
+    return journal
+
+# Function to append a batch of results and make them durable with a single fsync
+def append_records(journal, results, stamps=None):
+    for filename, result in results.items():
+        record = [filename, result] if stamps is None else [filename, result, stamps[filename]]
+        journal.write(json.dumps(record) + '\n')
+    journal.flush()
+    os.fsync(journal.fileno())
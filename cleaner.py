@@ -1,43 +1,94 @@
-import pandas as pd
-import re
-
-def clean_company_name(name):
-    name = re.sub(r'[^a-zA-Z0-9\s]', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
-
-def standardize_case(name):
-    return name.title()
-
-def remove_suffixes(name):
-    suffixes = ['Inc', 'Corp', 'Ltd', 'LLC', 'PLC', 'Co', 'Limited']
-    pattern = r'\b(?:' + '|'.join(suffixes) + r')\b'
-    return re.sub(pattern, '', name, flags=re.IGNORECASE).strip()
-
-def handle_abbreviations(name):
-    abbreviations = {
-        'Intl': 'International',
-        'Tech': 'Technology',
-        'Sys': 'Systems',
-        'Mfg': 'Manufacturing',
-        'Inds': 'Industries'
-    }
-    for abbr, full in abbreviations.items():
-        name = re.sub(r'\b' + abbr + r'\b', full, name, flags=re.IGNORECASE)
-    return name
-
-def format_company_name(name):
-    name = clean_company_name(name)
-    name = standardize_case(name)
-    name = remove_suffixes(name)
-    name = handle_abbreviations(name)
-    return name
-
-# Load the list of company names
-company_data = pd.read_csv('final_output.csv')
-
-# Apply formatting to each company name
-company_data['formatted_name'] = company_data['company_name'].apply(format_company_name)
-
-# Save the formatted names to a new CSV file
-company_data.to_csv('formatted_company_ids.csv', index=False)
+import os
+import re
+import json
+import pandas as pd
+
+SUFFIXES = ['Inc', 'Corp', 'Ltd', 'LLC', 'PLC', 'Co', 'Limited']
+ABBREVIATIONS = {
+    'Intl': 'International',
+    'Tech': 'Technology',
+    'Sys': 'Systems',
+    'Mfg': 'Manufacturing',
+    'Inds': 'Industries'
+}
+
+# Patterns compiled once instead of on every call
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-zA-Z0-9\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SUFFIX_PATTERN = re.compile(r'\b(?:' + '|'.join(SUFFIXES) + r')\b', flags=re.IGNORECASE)
+# One alternation for all abbreviations; no expansion contains another abbreviation,
+# so this gives the same result as substituting them one after another
+ABBREVIATION_PATTERN = re.compile(r'\b(?:' + '|'.join(ABBREVIATIONS) + r')\b', flags=re.IGNORECASE)
+ABBREVIATION_MAP = {abbr.lower(): full for abbr, full in ABBREVIATIONS.items()}
+
+# Bump when the rules above change so names cached by earlier runs are recomputed
+NORMALIZER_VERSION = 1
+
+def clean_company_name(name):
+    name = NON_ALPHANUMERIC_PATTERN.sub('', name)
+    name = WHITESPACE_PATTERN.sub(' ', name).strip()
+    return name
+
+def standardize_case(name):
+    return name.title()
+
+def remove_suffixes(name):
+    return SUFFIX_PATTERN.sub('', name).strip()
+
+def expand_abbreviation(match):
+    return ABBREVIATION_MAP[match.group(0).lower()]
+
+def handle_abbreviations(name):
+    return ABBREVIATION_PATTERN.sub(expand_abbreviation, name)
+
+def format_company_name(name):
+    name = clean_company_name(name)
+    name = standardize_case(name)
+    name = remove_suffixes(name)
+    name = handle_abbreviations(name)
+    return name
+
+def load_name_cache(cache_file):
+    if cache_file is not None and os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+        if cache.get('version') == NORMALIZER_VERSION:
+            return cache['names']
+    return {}
+
+def save_name_cache(cache_file, names):
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        json.dump({'version': NORMALIZER_VERSION, 'names': names}, file)
+    os.replace(tmp_file, cache_file)
+
+def format_company_names(names, cache_file=None):
+    # Each company name repeats once per quarter, so only distinct names are normalized
+    cache = load_name_cache(cache_file)
+    unique_names = pd.Series(pd.unique(names.astype(str)))
+    new_names = unique_names[~unique_names.isin(cache.keys())]
+    if len(new_names):
+        formatted = (
+            new_names.str.replace(NON_ALPHANUMERIC_PATTERN, '', regex=True)
+            .str.replace(WHITESPACE_PATTERN, ' ', regex=True)
+            .str.strip()
+            .str.title()
+            .str.replace(SUFFIX_PATTERN, '', regex=True)
+            .str.strip()
+            .str.replace(ABBREVIATION_PATTERN, expand_abbreviation, regex=True)
+        )
+        cache.update(zip(new_names, formatted))
+        if cache_file is not None:
+            save_name_cache(cache_file, cache)
+    print(f"Formatted {len(unique_names)} distinct names ({len(new_names)} new) for {len(names)} rows")
+    return names.astype(str).map(cache)
+
+if __name__ == "__main__":
+    # Load the list of company names
+    company_data = pd.read_csv('final_output.csv', dtype={'company_id': 'Int64'})
+
+    # Apply formatting to each company name, reusing names normalized in earlier runs
+    company_data['formatted_name'] = format_company_names(company_data['company_name'], cache_file='formatted_name_cache.json')
+
+    # Save the formatted names to a new CSV file
+    company_data.to_csv('formatted_company_ids.csv', index=False)
@@ -1,53 +1,77 @@
-import os
-import re
-import pandas as pd
-
-def get_file_list(directory):
-    """Get a list of JSON files in the specified directory."""
-    return [os.path.join(directory, file) for file in os.listdir(directory) if file.lower().endswith('json')]
-
-def extract_info_from_file(file_path):
-    """Extract company ID, company name, and earnings call period from a JSON file."""
-    with open(file_path, 'r') as file:
-        content = file.read()
-    company_id_pattern = r'"companyid":\s*(\d+)'
-    company_name_pattern = r'"companyname":\s*"([^"]+)"'
-    earnings_call_period_pattern = r'\bQ[1-4]\s\d{4}\b'
-    
-    company_id = re.findall(company_id_pattern, content)
-    company_name = re.findall(company_name_pattern, content)
-    earnings_call_period = re.findall(earnings_call_period_pattern, content)
-    
-    company_id = company_id[0] if company_id else 'N/A'
-    company_name = company_name[0] if company_name else 'N/A'
-    earnings_call_period = earnings_call_period[0] if earnings_call_period else 'N/A'
-    
-    return company_id, company_name, earnings_call_period
-
-# Example usage
-directory = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\B. Figure 1 2, Table 2, and IA Table 6 7 8 9 11\pseudo_transcripts'
-file_list = get_file_list(directory)
-
-# Initialize lists to store the extracted information
-company_ids = []
-company_names = []
-earnings_call_periods = []
-
-# Loop through the files and extract information
-for file_path in file_list:
-    company_id, company_name, earnings_call_period = extract_info_from_file(file_path)
-    company_ids.append(company_id)
-    company_names.append(company_name)
-    earnings_call_periods.append(earnings_call_period)
-
-# Create a DataFrame from the extracted information
-final_output = pd.DataFrame({
-    'file': file_list,
-    'company_id': company_ids,
-    'company_name': company_names,
-    'earnings_call_period': earnings_call_periods
-})
-
-# Save the DataFrame to a CSV file
-final_output.to_csv('final_output.csv', index=False)
-print(final_output)
+import os
+import re
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+# Compiled once; each is searched only until its first match
+FIELD_PATTERNS = {
+    'company_id': re.compile(r'"companyid":\s*(\d+)'),
+    'company_name': re.compile(r'"companyname":\s*"([^"]+)"'),
+    'earnings_call_period': re.compile(r'\bQ[1-4]\s\d{4}\b')
+}
+CHUNK_SIZE = 1 << 14
+# Characters carried over between chunks so a field cut at a chunk boundary is still found
+OVERLAP = 4096
+
+def get_file_list(directory):
+    """Get a list of JSON files in the specified directory."""
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries if entry.name.lower().endswith('json') and entry.is_file()]
+
+def search_first_matches(file, patterns, chunk_size=CHUNK_SIZE, overlap=OVERLAP):
+    """Read a file in chunks until every pattern has its first match, or the file ends."""
+    found = {}
+    buffer = ''
+    is_tail = False
+    while len(found) < len(patterns):
+        chunk = file.read(chunk_size)
+        at_eof = not chunk
+        buffer += chunk
+        # In a carried-over tail, position 0 was already searched with its real left context
+        start = 1 if is_tail else 0
+        for name, pattern in patterns.items():
+            if name in found:
+                continue
+            match = pattern.search(buffer, start)
+            # A match touching the end of the buffer may still grow (more digits, a longer name)
+            if match and (match.end() < len(buffer) or at_eof):
+                found[name] = match.group(1) if pattern.groups else match.group(0)
+        if at_eof:
+            break
+        if len(buffer) > overlap:
+            buffer = buffer[-overlap:]
+            is_tail = True
+    return found
+
+def extract_info_from_file(file_path):
+    """Extract company ID, company name, and earnings call period from a JSON file."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        found = search_first_matches(file, FIELD_PATTERNS)
+
+    company_id = int(found['company_id']) if 'company_id' in found else None
+    company_name = found.get('company_name', 'N/A')
+    earnings_call_period = found.get('earnings_call_period', 'N/A')
+
+    return company_id, company_name, earnings_call_period
+
+def extract_directory(directory, output_csv, max_workers=16):
+    """Extract every file's metadata on a thread pool and append rows to the CSV as they arrive."""
+    file_list = get_file_list(directory)
+    with open(output_csv, 'w', newline='', encoding='utf-8') as output, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = csv.writer(output)
+        writer.writerow(['file', 'company_id', 'company_name', 'earnings_call_period'])
+        # Threads overlap the network latency of the share; map keeps the listing order
+        for count, (file_path, info) in enumerate(zip(file_list, executor.map(extract_info_from_file, file_list)), start=1):
+            writer.writerow([file_path, *info])
+            if count % 1000 == 0:
+                output.flush()
+                print(f"Indexed {count} of {len(file_list)} files")
+    return len(file_list)
+
+if __name__ == "__main__":
+    # Example usage
+    directory = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\B. Figure 1 2, Table 2, and IA Table 6 7 8 9 11\pseudo_transcripts'
+
+    # Save the extracted information to a CSV file
+    num_files = extract_directory(directory, 'final_output.csv')
+    print(f"Saved {num_files} rows to final_output.csv")
@@ -0,0 +1,109 @@
+from collections import deque
+from ngram_matcher import ngram_words
+from multi_scorer import load_keyword_list
+from panel_store import read_panel
+from corpus_runner import run_corpus, write_score_columns
+from run_metrics import new_metrics
+
+# Words on either side of a climate term that count as its neighborhood (Sautner et al. use 10)
+WINDOW = 10
+# Neighbor categories a climate hit is conditioned on; each word in the lookup maps to a bitmask
+CLIMATE = 1
+CATEGORIES = ('risk', 'positive', 'negative')
+CATEGORY_BITS = {category: 2 << index for index, category in enumerate(CATEGORIES)}
+
+# Function to build one lookup from every list: word -> bitmask of the lists it belongs to
+def build_category_lookup(climate_words, neighbor_lists):
+    lookup = {}
+    for word in climate_words:
+        lookup[word.lower()] = lookup.get(word.lower(), 0) | CLIMATE
+    for category, words in neighbor_lists.items():
+        for word in words:
+            lookup[word.lower()] = lookup.get(word.lower(), 0) | CATEGORY_BITS[category]
+    return lookup
+
+# Function to count climate hits, and those with each category's words within +-window words, in one pass.
+# A climate hit at p is conditioned on a category if one of its words is at a position in [p - window, p + window]
+# other than p. The last position of each category is enough for the left side; for the right side a hit waits
+# in a queue until the stream is window words past it, and then the last position decides again.
+def score_window(words, lookup, window=WINDOW):
+    last_seen = {category: -window - 1 for category in CATEGORIES}
+    hits = {category: 0 for category in CATEGORIES}
+    climate_hits = 0
+    pending = deque()
+    position = -1
+
+    def settle(hit_position, left_flags):
+        for category in CATEGORIES:
+            if left_flags & CATEGORY_BITS[category] or last_seen[category] > hit_position:
+                hits[category] += 1
+
+    for position, word in enumerate(words):
+        # Hits more than window words back can no longer gain a right neighbor
+        while pending and pending[0][0] < position - window:
+            settle(*pending.popleft())
+        mask = lookup.get(word, 0)
+        if not mask:
+            continue
+        if mask & CLIMATE:
+            climate_hits += 1
+            left_flags = 0
+            for category in CATEGORIES:
+                if last_seen[category] >= position - window:
+                    left_flags |= CATEGORY_BITS[category]
+            pending.append((position, left_flags))
+        for category in CATEGORIES:
+            if mask & CATEGORY_BITS[category]:
+                last_seen[category] = position
+    while pending:
+        settle(*pending.popleft())
+    return climate_hits, hits, position + 1
+
+# Function to turn one transcript's counts into exposure columns, each per word of the transcript
+def calculate_window_exposures(climate_hits, hits, total_words):
+    if total_words == 0:
+        return {'cc_expo': 0, 'cc_risk': 0, 'cc_pos': 0, 'cc_neg': 0, 'cc_sent': 0}
+    return {
+        'cc_expo': climate_hits / total_words,
+        'cc_risk': hits['risk'] / total_words,
+        'cc_pos': hits['positive'] / total_words,
+        'cc_neg': hits['negative'] / total_words,
+        'cc_sent': (hits['positive'] - hits['negative']) / total_words
+    }
+
+# Function to score one transcript in a worker, run by corpus_runner.run_corpus; state is (lookup, window)
+def score_file(transcript_file, text, state):
+    lookup, window = state
+    climate_hits, hits, total_words = score_window(ngram_words(transcript_file, text), lookup, window)
+    return calculate_window_exposures(climate_hits, hits, total_words)
+
+# Function to score every transcript in a directory with the windowed measures
+def score_window_corpus(directory_path, lookup, window=WINDOW, max_workers=None, chunk_size=8, metrics=None, prefetch_threads=None):
+    results = run_corpus(directory_path, score_file, (lookup, window), max_workers, chunk_size, metrics, prefetch_threads)
+    scores = {}
+    for filename, exposures in results.items():
+        for column, exposure in exposures.items():
+            scores.setdefault(column, {})[filename] = exposure
+    print(f"Scored {len(results)} transcripts with a +-{window} word window")
+    return scores
+
+# Main function to add the climate exposure and its risk and sentiment-conditioned versions to the panel
+def main(directory_path, climate_file, neighbor_files, input_excel, output_excel, window=WINDOW, max_workers=None, metrics_file=None, prefetch_threads=None):
+    metrics = new_metrics()
+    lookup = build_category_lookup(load_keyword_list(climate_file), {category: load_keyword_list(path) for category, path in neighbor_files.items()})
+    df = read_panel(input_excel)
+    scores = score_window_corpus(directory_path, lookup, window, max_workers, metrics=metrics, prefetch_threads=prefetch_threads)
+    write_score_columns(df, output_excel, scores, metrics, metrics_file)
+
+if __name__ == "__main__":
+    directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'
+    climate_file = 'general_unigrams'
+    neighbor_files = {
+        'risk': r'/Users/mikiokilo/Downloads/uncertainty_words.csv',
+        'positive': r'/Users/mikiokilo/Downloads/positive_words.csv',
+        'negative': r'/Users/mikiokilo/Downloads/negative_words.csv'
+    }
+    input_excel = r'/Users/mikiokilo/Downloads/output_with_new_columns.xlsx'
+    output_excel = r'/Users/mikiokilo/Downloads/Final_Exposure_Outputs/climate_risk_scores.xlsx'
+
+    main(directory_path, climate_file, neighbor_files, input_excel, output_excel)
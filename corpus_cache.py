@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+import numpy as np
+from collections import Counter
+from keyword_matcher import WORD_PATTERN
+
+# Layout of a cache directory:
+#   manifest.json  - per-file path, size, mtime, sha1 and [start, end) token offsets
+#   vocab.json     - token strings, the list index is the token id
+#   tokens.bin     - all documents' token ids as one flat int32 array (memory-mappable)
+TOKEN_DTYPE = np.int32
+
+# Function to hash a transcript's raw bytes
+def file_hash(raw_bytes):
+    return hashlib.sha1(raw_bytes).hexdigest()
+
+# Function to load the manifest, vocabulary and token array of an existing cache
+def load_corpus_cache(cache_dir):
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as file:
+        manifest = json.load(file)
+    with open(os.path.join(cache_dir, 'vocab.json'), 'r', encoding='utf-8') as file:
+        vocab = json.load(file)
+    tokens_path = os.path.join(cache_dir, 'tokens.bin')
+    if os.path.getsize(tokens_path) > 0:
+        tokens = np.memmap(tokens_path, dtype=TOKEN_DTYPE, mode='r')
+    else:
+        tokens = np.zeros(0, dtype=TOKEN_DTYPE)
+    files = manifest['files']
+    offsets = np.array([0] + [entry['end'] for entry in files], dtype=np.int64)
+    return {
+        'directory': manifest['directory'],
+        'files': files,
+        'filenames': [entry['filename'] for entry in files],
+        'offsets': offsets,
+        'vocab': vocab,
+        'tokens': tokens
+    }
+
+# Function to check an existing cache against the directory; returns its entries, with the mtimes of
+# touched but unmodified files refreshed, or None when a file was added, removed or modified
+def unchanged_entries(directory_path, txt_files, previous):
+    if previous is None or txt_files != previous['filenames'] or previous['directory'] != os.path.abspath(directory_path):
+        return None
+    entries = []
+    for old in previous['files']:
+        transcript_file = os.path.join(directory_path, old['filename'])
+        stat = os.stat(transcript_file)
+        if old['size'] != stat.st_size:
+            return None
+        if old['mtime'] != stat.st_mtime:
+            with open(transcript_file, 'rb') as file:
+                if file_hash(file.read()) != old['sha1']:
+                    return None
+            old = dict(old, mtime=stat.st_mtime)
+        entries.append(old)
+    return entries
+
+# Function to write a manifest listing the cached transcripts of a directory
+def write_manifest(manifest_path, directory_path, entries):
+    with open(manifest_path, 'w') as file:
+        json.dump({'directory': os.path.abspath(directory_path), 'files': entries}, file)
+
+# Function to tokenize every transcript once and refresh only new or changed files
+def build_corpus_cache(directory_path, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = load_corpus_cache(cache_dir)
+    previous_entries = {}
+    vocab = []
+    if previous is not None:
+        previous_entries = {entry['filename']: entry for entry in previous['files']}
+        vocab = previous['vocab']
+    # The vocabulary only ever grows, so ids stored for unchanged files stay valid
+    vocab_index = {token: token_id for token_id, token in enumerate(vocab)}
+
+    txt_files = sorted(filename for filename in os.listdir(directory_path) if filename.endswith('.txt'))
+    # Nothing to re-tokenize: keep tokens.bin and vocab.json as they are, only touched mtimes go to the manifest
+    entries = unchanged_entries(directory_path, txt_files, previous)
+    if entries is not None:
+        print(f"Corpus cache: {len(entries)} transcripts, all reused, {len(vocab)} distinct tokens.")
+        if entries == previous['files']:
+            return previous
+        manifest_path = os.path.join(cache_dir, 'manifest.json')
+        write_manifest(manifest_path + '.tmp', directory_path, entries)
+        previous = None
+        os.replace(manifest_path + '.tmp', manifest_path)
+        return load_corpus_cache(cache_dir)
+    tmp_tokens_path = os.path.join(cache_dir, 'tokens.bin.tmp')
+    entries = []
+    position = 0
+    reused = 0
+    with open(tmp_tokens_path, 'wb') as tokens_file:
+        for filename in txt_files:
+            transcript_file = os.path.join(directory_path, filename)
+            stat = os.stat(transcript_file)
+            old = previous_entries.get(filename)
+            ids = None
+            if old is not None and old['size'] == stat.st_size and old['mtime'] == stat.st_mtime:
+                ids = previous['tokens'][old['start']:old['end']]
+                digest = old['sha1']
+            else:
+                with open(transcript_file, 'rb') as file:
+                    raw_bytes = file.read()
+                digest = file_hash(raw_bytes)
+                if old is not None and old['sha1'] == digest:
+                    ids = previous['tokens'][old['start']:old['end']]
+            if ids is not None:
+                reused += 1
+            else:
+                # str.split() gives the same tokens as clean_text(text).split()
+                words = raw_bytes.decode('utf-8').split()
+                ids = np.fromiter((vocab_index.setdefault(word, len(vocab_index)) for word in words), dtype=TOKEN_DTYPE, count=len(words))
+            tokens_file.write(np.ascontiguousarray(ids, dtype=TOKEN_DTYPE).tobytes())
+            entries.append({
+                'filename': filename,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'sha1': digest,
+                'start': position,
+                'end': position + len(ids)
+            })
+            position += len(ids)
+
+    vocab = [None] * len(vocab_index)
+    for token, token_id in vocab_index.items():
+        vocab[token_id] = token
+    tmp_vocab_path = os.path.join(cache_dir, 'vocab.json.tmp')
+    with open(tmp_vocab_path, 'w', encoding='utf-8') as file:
+        json.dump(vocab, file)
+    tmp_manifest_path = os.path.join(cache_dir, 'manifest.json.tmp')
+    write_manifest(tmp_manifest_path, directory_path, entries)
+
+    # Release every view of the old memory map before replacing the file underneath it
+    ids = old = previous = None
+    # The manifest goes first and comes back last, so a swap cut short leaves no cache rather than a mismatched one
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.replace(tmp_tokens_path, os.path.join(cache_dir, 'tokens.bin'))
+    os.replace(tmp_vocab_path, os.path.join(cache_dir, 'vocab.json'))
+    os.replace(tmp_manifest_path, manifest_path)
+    print(f"Corpus cache: {len(entries)} transcripts, {reused} reused, {len(entries) - reused} tokenized, {len(vocab)} distinct tokens.")
+    return load_corpus_cache(cache_dir)
+
+# Function to get the token ids of one document by its position in the cache
+def document_tokens(cache, index):
+    return cache['tokens'][cache['offsets'][index]:cache['offsets'][index + 1]]
+
+# Function to sum a per-token weight over every document in one vectorized pass
+def sum_per_document(cache, token_weights):
+    cumulative = np.concatenate(([0], np.cumsum(token_weights[cache['tokens']], dtype=np.int64)))
+    return cumulative[cache['offsets'][1:]] - cumulative[cache['offsets'][:-1]]
+
+# Function to count keyword hits per document with r'\b<keyword>\b' semantics
+def count_matcher_hits(cache, matcher):
+    # Match each distinct vocabulary token once instead of every occurrence
+    if matcher['patterns']:
+        raise ValueError("Keywords containing spaces or punctuation are not supported on the corpus cache.")
+    words = matcher['words']
+    hits = np.zeros(len(cache['vocab']), dtype=np.int64)
+    for token_id, token in enumerate(cache['vocab']):
+        if token in words:
+            hits[token_id] = 1
+        else:
+            hits[token_id] = sum(1 for part in WORD_PATTERN.findall(token) if part in words)
+    return sum_per_document(cache, hits)
+
+# Function to yield exact whitespace-token keyword counts and lengths per document
+def iter_token_counts(cache, unigrams):
+    vocab_index = {token: token_id for token_id, token in enumerate(cache['vocab'])}
+    keyword_ids = {vocab_index[unigram]: unigram for unigram in unigrams if unigram in vocab_index}
+    is_keyword = np.zeros(len(cache['vocab']), dtype=bool)
+    is_keyword[list(keyword_ids)] = True
+    for index, filename in enumerate(cache['filenames']):
+        ids = document_tokens(cache, index)
+        matched = Counter(ids[is_keyword[ids]].tolist())
+        unigram_counts = {keyword_ids[token_id]: count for token_id, count in matched.items()}
+        yield filename, unigram_counts, len(ids)
@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from transcript_reader import iter_words
+from panel_store import join_scores, write_panel_columns
+from prefetch_reader import prefetch_files, iter_chunks, map_bounded
+from run_metrics import new_metrics, timed, record_document, record_queue_depth, merge_metrics, report_progress, format_summary, write_metrics
+
+# A corpus scorer supplies one module-level function, score_file(transcript_file, text, state), and the
+# state it needs (e.g. a compiled lookup). text is the transcript already read by the prefetcher, or None
+# when the function should stream the file itself. run_corpus maps it over every transcript on a process
+# pool, at most MAX_PENDING_CHUNKS chunks in flight, and folds the workers' stage metrics into the run's.
+
+# Function and state held by each worker process, shipped once by the pool initializer
+worker_score_file = None
+worker_state = None
+
+# Function run once in every worker process when the pool starts
+def init_worker(score_file, state):
+    global worker_score_file, worker_state
+    worker_score_file = score_file
+    worker_state = state
+
+# Function to give a scorer the whitespace-separated words of a transcript, prefetched or streamed
+def transcript_words(transcript_file, text=None):
+    return text.split() if text is not None else iter_words(transcript_file)
+
+# Function to score a chunk of transcripts in a worker; each item is a file path or a (path, text) pair
+def score_chunk(items):
+    results = []
+    metrics = new_metrics()
+    for item in items:
+        transcript_file, text = item if isinstance(item, tuple) else (item, None)
+        start = time.perf_counter()
+        with timed(metrics, 'score'):
+            result = worker_score_file(transcript_file, text, worker_state)
+        record_document(metrics, os.path.basename(transcript_file), time.perf_counter() - start)
+        results.append((os.path.basename(transcript_file), result))
+    return results, metrics
+
+# Function to score every transcript in a directory, returning {filename: result}
+def run_corpus(directory_path, score_file, state, max_workers=None, chunk_size=8, metrics=None, prefetch_threads=None):
+    if metrics is None:
+        metrics = new_metrics()
+    txt_files = sorted(filename for filename in os.listdir(directory_path) if filename.endswith('.txt'))
+    transcript_files = [os.path.join(directory_path, filename) for filename in txt_files]
+    # Threads read ahead and hand whole buffers to the workers when prefetching; otherwise workers stream the files
+    items = prefetch_files(transcript_files, prefetch_threads) if prefetch_threads else transcript_files
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(score_file, state)) as executor:
+        # Results are keyed by file name, so completion order does not matter
+        for (chunk_results, worker_metrics), pending in map_bounded(executor, score_chunk, iter_chunks(items, chunk_size)):
+            record_queue_depth(metrics, pending)
+            merge_metrics(metrics, worker_metrics)
+            results.update(chunk_results)
+            report_progress(metrics)
+    return results
+
+# Function to join score columns ({column: {filename: score}}) onto the panel and write only those columns
+def write_score_columns(df, output_excel, scores, metrics, metrics_file=None):
+    for column, column_scores in scores.items():
+        join_scores(df, column_scores, column)
+    with timed(metrics, 'write'):
+        write_panel_columns(df, output_excel, list(scores))
+    print(f"Data saved to {output_excel}")
+    print(format_summary(metrics))
+    if metrics_file is not None:
+        write_metrics(metrics, metrics_file)
+    print(f"Total execution time: {time.time() - metrics['started']} seconds")
@@ -0,0 +1,85 @@
+import os
+import pickle
+import hashlib
+import zipfile
+from keyword_matcher import build_matcher
+from dta_pkl_reader import build_ngram_index
+
+# The keyword lists shipped with the repository
+DEFAULT_ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unigrams .zip')
+# Bump when normalization or the compiled lookup changes so cached lookups are rebuilt
+REGISTRY_VERSION = 1
+
+# A compiled dictionary is cached in cache_dir as <name>-<version>.pkl, where the version
+# hashes the normalized list, so an edited list never picks up a stale lookup.
+
+# Function to read every keyword list in an archive, skipping the __MACOSX metadata entries
+def read_archive_lists(zip_path=DEFAULT_ARCHIVE):
+    lists = {}
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in archive.namelist():
+            if name.startswith('__MACOSX') or not name.endswith('.txt'):
+                continue
+            lists[os.path.splitext(os.path.basename(name))[0]] = archive.read(name).decode('utf-8')
+    return lists
+
+# Function to normalize a list's text: stripped, non-empty lines. Order and repeats are kept,
+# since the equal-weighted measure divides by the list length including repeated entries
+def normalize_list(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+# Function to read a keyword list from a txt file, or by name (e.g. 'general_unigrams') from the archive;
+# only a bare name, with no directory and no extension, is looked up in the archive
+def load_keywords(source, zip_path=DEFAULT_ARCHIVE):
+    if os.path.dirname(source) or os.path.splitext(source)[1] or os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as file:
+            return normalize_list(file.read())
+    lists = read_archive_lists(zip_path)
+    if source not in lists:
+        raise ValueError(f"{source} is neither a file nor one of the lists in {zip_path}: {', '.join(sorted(lists))}.")
+    return normalize_list(lists[source])
+
+# Function to hash a normalized list, identifying the dictionary version every process scores against
+def list_version(keywords):
+    digest = hashlib.sha1(f"registry {REGISTRY_VERSION}\n".encode('utf-8'))
+    digest.update('\n'.join(keywords).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+# Function to compile a list into its ready-to-use lookups
+def build_dictionary(name, keywords):
+    return {
+        'name': name,
+        'version': list_version(keywords),
+        'unigrams': keywords,
+        'size': len(keywords),
+        'keywords': frozenset(keywords),
+        'matcher': build_matcher(keywords),
+        'ngram_index': build_ngram_index(tuple(keyword.split()) for keyword in keywords)
+    }
+
+# Function to load a compiled dictionary, from the cache when this list version was compiled before
+def load_dictionary(source, cache_dir=None, zip_path=DEFAULT_ARCHIVE):
+    name = os.path.splitext(os.path.basename(source))[0]
+    keywords = load_keywords(source, zip_path)
+    if cache_dir is None:
+        return build_dictionary(name, keywords)
+    cache_file = os.path.join(cache_dir, f"{name}-{list_version(keywords)}.pkl")
+    if os.path.exists(cache_file):
+        with open(cache_file, 'rb') as file:
+            return pickle.load(file)
+    dictionary = build_dictionary(name, keywords)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Shards and pool workers may compile the same list at once, so each writes its own temp file
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as file:
+        pickle.dump(dictionary, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return dictionary
+
+# Function to load every list in the archive as a compiled dictionary
+def load_registry(zip_path=DEFAULT_ARCHIVE, cache_dir=None):
+    return {name: load_dictionary(name, cache_dir, zip_path) for name in sorted(read_archive_lists(zip_path))}
+
+if __name__ == "__main__":
+    for name, dictionary in load_registry(cache_dir='dictionary_cache').items():
+        print(f"{name}: {dictionary['size']} entries, {len(dictionary['keywords'])} distinct, version {dictionary['version']}")
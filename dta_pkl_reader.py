@@ -1,56 +1,141 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Thu Jun 20 17:16:53 2024
-
-@author: aranyeok
-"""
-
-import pandas as pd
-import pyreadstat
-
-# Load the .dta file
-file_path = '\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\A. Main Tables and Figures\data'  # Update with the correct path to your file
-df, meta = pyreadstat.read_dta(file_path)
-
-# Display the first few rows of the dataframe
-print(df.head())
-
-# Display the metadata
-print(meta.column_names)
-print(meta.column_labels)
-
-import pandas as pd
-import pyreadstat
-
-# Load the .dta file
-file_path = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\A. Main Tables and Figures\data\SvLVZ_OI_pseudo.dta'
-df, meta = pyreadstat.read_dta(file_path)
-
-# Display the first few rows of the dataframe
-print(df.head())
-
-# Display the metadata
-print(meta.column_names)
-print(meta.column_labels)
-
-# Save the dataframe to an Excel file
-output_file_path = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\A. Main Tables and Figures\data\output_file2.xlsx'
-df.to_excel(output_file_path, index=False)
-print(f"Data saved to {output_file_path}")
-
-import pickle
-
-# Function to read a pickle file
-def read_pickle_file(file_path):
-    with open(file_path, 'rb') as file:
-        data = pickle.load(file)
-    return data
-
-# Path to your pickle file
-pickle_file_path = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\B. Figure 1 2, Table 2, and IA Table 6 7 8 9 11\bigrams\opportunity_bigrams_4.pkl'  # Replace with your file path
-
-# Read the pickle file
-data = read_pickle_file(pickle_file_path)
-
-# Print the contents of the pickle file
-print(data)
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Jun 20 17:16:53 2024
+
+@author: aranyeok
+"""
+
+import os
+import json
+import pickle
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows parsed from the .dta file at a time when converting it to the columnar cache
+DTA_CHUNK_SIZE = 100000
+
+# A converted .dta file is cached in cache_dir as two files:
+#   <name>.parquet - every column of the .dta file
+#   <name>.json    - the source file's size and mtime, plus its column names and labels
+def dta_cache_paths(dta_path, cache_dir):
+    name = os.path.splitext(os.path.basename(dta_path))[0]
+    return os.path.join(cache_dir, f"{name}.parquet"), os.path.join(cache_dir, f"{name}.json")
+
+# Function to convert a .dta file to Parquet in row chunks, so the whole file is never parsed into memory at once
+def convert_dta(dta_path, cache_dir, chunk_size=DTA_CHUNK_SIZE):
+    import pyreadstat
+    os.makedirs(cache_dir, exist_ok=True)
+    parquet_path, meta_path = dta_cache_paths(dta_path, cache_dir)
+    tmp_path = parquet_path + '.tmp'
+    writer = None
+    meta = None
+    try:
+        for chunk, meta in pyreadstat.read_file_in_chunks(pyreadstat.read_dta, dta_path, chunksize=chunk_size):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    if meta is None:
+        # An empty file: keep the column names from the header
+        empty_df, meta = pyreadstat.read_dta(dta_path, metadataonly=True)
+        empty_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+
+    stat = os.stat(dta_path)
+    with open(meta_path, 'w') as file:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'column_names': meta.column_names, 'column_labels': meta.column_labels}, file)
+    print(f"Converted {dta_path} to {parquet_path}")
+
+# Function to read the metadata of a cached conversion, or None if the .dta file changed since
+def load_dta_meta(dta_path, cache_dir):
+    parquet_path, meta_path = dta_cache_paths(dta_path, cache_dir)
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, 'r') as file:
+        meta = json.load(file)
+    stat = os.stat(dta_path)
+    if meta['size'] != stat.st_size or meta['mtime'] != stat.st_mtime:
+        return None
+    return meta
+
+# Function to load only the needed columns of a .dta file, through the Parquet cache when cache_dir is given
+def load_dta(dta_path, columns=None, cache_dir=None, chunk_size=DTA_CHUNK_SIZE):
+    if cache_dir is None:
+        import pyreadstat
+        df, _ = pyreadstat.read_dta(dta_path, usecols=columns)
+        return df
+    if load_dta_meta(dta_path, cache_dir) is None:
+        convert_dta(dta_path, cache_dir, chunk_size)
+    parquet_path, _ = dta_cache_paths(dta_path, cache_dir)
+    return pd.read_parquet(parquet_path, columns=columns)
+
+# Function to read a pickle file
+def read_pickle_file(file_path):
+    with open(file_path, 'rb') as file:
+        data = pickle.load(file)
+    return data
+
+# Function to turn the contents of a bigram pickle into lowercase word tuples
+def pickle_ngrams(data):
+    if isinstance(data, pd.DataFrame):
+        # A frame of n-grams, possibly with scores: use the first text column
+        text_columns = [column for column in data.columns if data[column].dtype == object or pd.api.types.is_string_dtype(data[column].dtype)]
+        data = data[text_columns[0]] if text_columns else data.index
+    elif isinstance(data, pd.Series):
+        # A Series of weights is indexed by its n-grams
+        data = data if data.dtype == object or pd.api.types.is_string_dtype(data.dtype) else data.index
+    elif isinstance(data, dict):
+        data = data.keys()
+    ngrams = []
+    for ngram in data:
+        if isinstance(ngram, str):
+            words = ngram.lower().replace('_', ' ').split()
+        else:
+            words = [str(word).lower() for word in ngram]
+        if words:
+            ngrams.append(tuple(words))
+    return ngrams
+
+# Function to build the matcher index of an n-gram list: one set of word tuples per n-gram length
+def build_ngram_index(ngrams):
+    index = {}
+    for ngram in ngrams:
+        index.setdefault(len(ngram), set()).add(tuple(ngram))
+    return {length: frozenset(entries) for length, entries in sorted(index.items())}
+
+# Function to load a bigram pickle straight into its matcher index
+def load_bigram_index(pickle_path):
+    return build_ngram_index(pickle_ngrams(read_pickle_file(pickle_path)))
+
+if __name__ == "__main__":
+    data_dir = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\A. Main Tables and Figures\data'
+    file_path = os.path.join(data_dir, 'SvLVZ_OI_pseudo.dta')
+    cache_dir = 'reference_cache'
+
+    # The first run converts the .dta file once; later runs read the cached Parquet file
+    df = load_dta(file_path, cache_dir=cache_dir)
+    meta = load_dta_meta(file_path, cache_dir)
+
+    # Display the first few rows of the dataframe
+    print(df.head())
+
+    # Display the metadata
+    print(meta['column_names'])
+    print(meta['column_labels'])
+
+    # Set to a path to also export the data to Excel
+    output_file_path = None
+    if output_file_path:
+        df.to_excel(output_file_path, index=False)
+        print(f"Data saved to {output_file_path}")
+
+    # Path to your pickle file
+    pickle_file_path = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\B. Figure 1 2, Table 2, and IA Table 6 7 8 9 11\bigrams\opportunity_bigrams_4.pkl'  # Replace with your file path
+
+    # Build the bigram matcher index from the pickle
+    bigram_index = load_bigram_index(pickle_file_path)
+    print({length: len(entries) for length, entries in bigram_index.items()})
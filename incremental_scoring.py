@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import math
+import hashlib
+import numpy as np
+from collections import Counter
+from keyword_matcher import build_matcher, count_matches, count_word_matches
+from transcript_reader import iter_words
+from checkpoint_journal import journal_key
+from dictionary_registry import list_version
+from tfidf_matrix import build_matrix_from_counts, weight_exposures
+
+# Incremental state is one JSON file per score column and keyword list, <column>-<list version>.json,
+# so a script run in turn with several lists keeps the state of each:
+#   dictionary_version - hash of the column name and keyword list the results belong to
+#   files              - per transcript: size, mtime, sha1 and the counts it was scored from
+#   scores             - per transcript: the stored score
+#   doc_freq           - TF-IDF only: keyword document frequencies over the current corpus
+
+# Function to hash a transcript without holding it in memory
+def hash_file(transcript_file, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(transcript_file, 'rb') as file:
+        for block in iter(lambda: file.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to name the state file of a column scored with a given keyword list; sorted, since
+# the TF-IDF list arrives as a set whose order differs between runs
+def state_path(state_dir, column, unigrams):
+    return os.path.join(state_dir, f"{column}-{list_version(sorted(unigrams))}.json")
+
+# Function to load the stored state of a column, or an empty one if the dictionary changed
+def load_state(state_file, dictionary_version):
+    if os.path.exists(state_file):
+        with open(state_file, 'r') as file:
+            state = json.load(file)
+        if state.get('dictionary_version') == dictionary_version:
+            return state
+        print(f"Dictionary changed since {state_file} was written, rescoring every transcript")
+    return {'dictionary_version': dictionary_version, 'files': {}, 'scores': {}, 'doc_freq': {}}
+
+# Function to save the state of a column, replacing the previous file in one step
+def save_state(state_file, state):
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as file:
+        json.dump(state, file)
+    os.replace(tmp_file, state_file)
+
+# Function to compare the transcript directory with the stored manifest
+def scan_transcripts(directory_path, previous_files):
+    current_files = {}
+    changed = []
+    for filename in sorted(os.listdir(directory_path)):
+        if not filename.endswith('.txt'):
+            continue
+        stat = os.stat(os.path.join(directory_path, filename))
+        old = previous_files.get(filename)
+        if old is not None and old['size'] == stat.st_size and old['mtime'] == stat.st_mtime:
+            current_files[filename] = old
+            continue
+        digest = hash_file(os.path.join(directory_path, filename))
+        if old is not None and old['sha1'] == digest:
+            # Touched but not modified: keep the stored results
+            current_files[filename] = dict(old, mtime=stat.st_mtime)
+            continue
+        current_files[filename] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': digest}
+        changed.append(filename)
+    removed = [filename for filename in previous_files if filename not in current_files]
+    return current_files, changed, removed
+
+# Function to bring equal-weighted exposures up to date, scoring only new or changed transcripts
+def update_equal_weighted(directory_path, state_dir, column, unigrams):
+    os.makedirs(state_dir, exist_ok=True)
+    state_file = state_path(state_dir, column, unigrams)
+    state = load_state(state_file, journal_key(column, unigrams))
+    files, changed, removed = scan_transcripts(directory_path, state['files'])
+    matcher = build_matcher(unigrams)
+
+    scores = {filename: state['scores'][filename] for filename in files if filename not in changed}
+    for filename in changed:
+        transcript_file = os.path.join(directory_path, filename)
+        if matcher['patterns']:
+            # Keywords with spaces or punctuation are matched against the whole cleaned transcript
+            with open(transcript_file, 'r', encoding='utf-8') as file:
+                unigram_counts = count_matches(re.sub(r'\s+', ' ', file.read()), matcher)
+        else:
+            unigram_counts = count_word_matches(iter_words(transcript_file), matcher)
+        total_count = sum(unigram_counts.values())
+        scores[filename] = total_count / len(unigrams) if total_count else 0
+
+    save_state(state_file, {'dictionary_version': state['dictionary_version'], 'files': files, 'scores': scores, 'doc_freq': {}})
+    print(f"Incremental {column}: {len(changed)} new or changed, {len(removed)} removed, {len(files) - len(changed)} reused")
+    return scores
+
+# Function to count one transcript's exact whitespace-token keywords and its length
+def count_keywords(transcript_file, unigram_set):
+    unigram_counts = Counter()
+    total_words = 0
+    for word in iter_words(transcript_file):
+        total_words += 1
+        if word in unigram_set:
+            unigram_counts[word] += 1
+    return dict(unigram_counts), total_words
+
+# Function to bring TF-IDF exposures up to date, updating document frequencies by delta
+def update_tfidf(directory_path, state_dir, column, unigrams):
+    os.makedirs(state_dir, exist_ok=True)
+    state_file = state_path(state_dir, column, unigrams)
+    state = load_state(state_file, journal_key(column, unigrams))
+    previous_files = state['files']
+    files, changed, removed = scan_transcripts(directory_path, previous_files)
+    unigram_set = set(unigrams)
+
+    # Take the old versions of changed and removed transcripts out of the document frequencies
+    old_doc_freq = state['doc_freq']
+    doc_freq = Counter(old_doc_freq)
+    for filename in removed + [filename for filename in changed if filename in previous_files]:
+        doc_freq.subtract(previous_files[filename]['counts'].keys())
+    for filename in changed:
+        unigram_counts, total_words = count_keywords(os.path.join(directory_path, filename), unigram_set)
+        files[filename].update(counts=unigram_counts, total_words=total_words)
+        doc_freq.update(unigram_counts.keys())
+    doc_freq = {unigram: count for unigram, count in doc_freq.items() if count > 0}
+
+    # A different corpus size moves every IDF; otherwise only rows using a keyword whose
+    # document frequency moved, plus the changed transcripts themselves, need re-weighting
+    N = len(files)
+    if N != len(previous_files):
+        affected = sorted(files)
+    else:
+        moved = {unigram for unigram in set(doc_freq) | set(old_doc_freq) if doc_freq.get(unigram, 0) != old_doc_freq.get(unigram, 0)}
+        affected = sorted(filename for filename, entry in files.items() if filename in changed or moved.intersection(entry['counts']))
+
+    scores = {filename: state['scores'][filename] for filename in files if filename not in affected}
+    if affected:
+        counts, total_words, keywords = build_matrix_from_counts([(files[filename]['counts'], files[filename]['total_words']) for filename in affected], unigram_set)
+        idf = np.array([math.log(N / doc_freq[keyword]) if doc_freq.get(keyword) else 0 for keyword in keywords])
+        scores.update(zip(affected, weight_exposures(counts, total_words, idf, len(unigram_set))))
+
+    save_state(state_file, {'dictionary_version': state['dictionary_version'], 'files': files, 'scores': scores, 'doc_freq': doc_freq})
+    print(f"Incremental {column}: {len(changed)} new or changed, {len(removed)} removed, {len(affected)} rows re-weighted")
+    return scores
@@ -0,0 +1,97 @@
+import os
+import re
+import sys
+import zipfile
+from collections import Counter
+
+# A keyword made only of word characters matches r'\b<keyword>\b' exactly when
+# it equals a whole run of word characters, so one tokenizing scan is enough
+WORD_PATTERN = re.compile(r'\w+')
+
+# Function to build a single lookup index over a keyword list
+def build_matcher(unigrams):
+    words = set()
+    patterns = {}
+    for unigram in unigrams:
+        if WORD_PATTERN.fullmatch(unigram):
+            words.add(unigram)
+        else:
+            # Keywords with punctuation or spaces keep their own boundary regex
+            patterns[unigram] = re.compile(r'\b' + re.escape(unigram) + r'\b')
+    return {'words': frozenset(words), 'patterns': patterns}
+
+# Function to count all keyword hits in one pass over the text
+def count_matches(text, matcher):
+    words = matcher['words']
+    token_counts = Counter(WORD_PATTERN.findall(text))
+    if len(token_counts) < len(words):
+        unigram_counts = Counter({token: count for token, count in token_counts.items() if token in words})
+    else:
+        unigram_counts = Counter({word: token_counts[word] for word in words if word in token_counts})
+    for unigram, pattern in matcher['patterns'].items():
+        count = len(pattern.findall(text))
+        if count:
+            unigram_counts[unigram] = count
+    return unigram_counts
+
+# Function to count keyword hits over a stream of whitespace-separated words
+def count_word_matches(words, matcher):
+    return count_token_matches(Counter(words), matcher)
+
+# Function to count keyword hits from already-counted whitespace-separated words
+def count_token_matches(token_counts, matcher):
+    if matcher['patterns']:
+        raise ValueError("Keywords containing spaces or punctuation need the whole text, use count_matches.")
+    keyword_set = matcher['words']
+    unigram_counts = Counter()
+    for token, count in token_counts.items():
+        if token in keyword_set:
+            unigram_counts[token] += count
+        else:
+            for part in WORD_PATTERN.findall(token):
+                if part in keyword_set:
+                    unigram_counts[part] += count
+    return unigram_counts
+
+# Reference implementation: one regex scan per keyword, as the exposure scripts used to do
+def count_unigrams_regex(text, unigrams):
+    unigram_counts = Counter()
+    for unigram in unigrams:
+        unigram_counts[unigram] = len(re.findall(r'\b' + re.escape(unigram) + r'\b', text))
+    return unigram_counts
+
+# Function to load every keyword list shipped in the unigrams archive
+def load_zipped_unigrams(zip_path):
+    unigram_lists = {}
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in archive.namelist():
+            if name.startswith('__MACOSX') or not name.endswith('.txt'):
+                continue
+            text = archive.read(name).decode('utf-8')
+            unigram_lists[os.path.basename(name)] = text.splitlines()
+    return unigram_lists
+
+# Function to check the matcher against the per-regex counts on a set of transcripts
+def check_parity(transcript_files, unigram_lists):
+    mismatches = 0
+    for list_name, unigrams in unigram_lists.items():
+        matcher = build_matcher(unigrams)
+        for transcript_file in transcript_files:
+            with open(transcript_file, 'r', encoding='utf-8') as file:
+                text = re.sub(r'\s+', ' ', file.read())
+            expected = +count_unigrams_regex(text, unigrams)
+            actual = count_matches(text, matcher)
+            if expected != actual:
+                mismatches += 1
+                print(f"Mismatch for {list_name} on {transcript_file}")
+    print(f"Checked {len(unigram_lists)} lists on {len(transcript_files)} transcripts, {mismatches} mismatches.")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    # Usage: python keyword_matcher.py <transcripts_dir> [max_files]
+    directory_path = sys.argv[1]
+    max_files = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    zip_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unigrams .zip')
+    transcript_files = [os.path.join(directory_path, filename) for filename in sorted(os.listdir(directory_path)) if filename.endswith('.txt')][:max_files]
+    ok = check_parity(transcript_files, load_zipped_unigrams(zip_path))
+    sys.exit(0 if ok else 1)
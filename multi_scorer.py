@@ -0,0 +1,155 @@
+import re
+import pandas as pd
+from collections import Counter
+from keyword_matcher import WORD_PATTERN, build_matcher
+from text_tokenizer import tokenize_fast
+from panel_store import read_panel
+from tfidf_matrix import build_matrix_from_counts, calculate_exposures
+from dictionary_registry import load_keywords
+from corpus_runner import run_corpus, transcript_words, write_score_columns
+from run_metrics import new_metrics
+
+# Measures a keyword list can be scored with, each following the script it replaces:
+#   equal_weighted - r'\b<keyword>\b' hits / list length (EQUAL-WEIGHTED EXPOSURE.py)
+#   tfidf          - whitespace-token TF-IDF summed and normalized (TF-IDF EXPOSURE.py)
+#   count          - hits among lowercased alphabetic words from tokenize_fast (Sentiment.py word counts)
+MEASURES = ('equal_weighted', 'tfidf', 'count')
+
+# Function to load a keyword list from a txt file, a CSV with a 'Word' column, or by name from 'unigrams .zip'
+def load_keyword_list(path):
+    if path.lower().endswith('.csv'):
+        return pd.read_csv(path)['Word'].dropna().astype(str).tolist()
+    return load_keywords(path)
+
+# Function to build one lookup mapping every token to the dictionaries it belongs to
+def build_lookup(dictionaries):
+    lookup = {'exact': {}, 'words': {}, 'lower': {}, 'patterns': {}, 'dictionaries': []}
+    for index, (column, measure, unigrams) in enumerate(dictionaries):
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure} for {column}, expected one of {MEASURES}.")
+        if measure == 'tfidf':
+            table, keywords = lookup['exact'], set(unigrams)
+        elif measure == 'equal_weighted':
+            # Keywords with spaces or punctuation keep their own boundary regex, as in count_matches
+            matcher = build_matcher(unigrams)
+            table, keywords = lookup['words'], matcher['words']
+            if matcher['patterns']:
+                lookup['patterns'][index] = matcher['patterns']
+        else:
+            # Tokens are lowercased before counting, so the list is too
+            table, keywords = lookup['lower'], {unigram.lower() for unigram in unigrams}
+        for keyword in keywords:
+            table.setdefault(keyword, []).append(index)
+        lookup['dictionaries'].append({'column': column, 'measure': measure, 'size': len(unigrams), 'unique_size': len(set(unigrams))})
+    return lookup
+
+# Function to resolve one whitespace token into the (dictionary, keyword) hits it contains
+def resolve_token(token, lookup):
+    hits = []
+    for index in lookup['exact'].get(token, ()):
+        hits.append((index, token))
+    if lookup['words']:
+        for part in WORD_PATTERN.findall(token):
+            for index in lookup['words'].get(part, ()):
+                hits.append((index, part))
+    if lookup['lower']:
+        for word in tokenize_fast(token):
+            for index in lookup['lower'].get(word, ()):
+                hits.append((index, word))
+    return hits
+
+# Function to score one transcript's words against every dictionary in a single traversal
+def score_words(words, lookup, memo=None):
+    if memo is None:
+        memo = {}
+    token_counts = Counter(words)
+    keyword_counts = [Counter() for _ in lookup['dictionaries']]
+    for token, count in token_counts.items():
+        hits = memo.get(token)
+        if hits is None:
+            hits = memo[token] = resolve_token(token, lookup)
+        for index, keyword in hits:
+            keyword_counts[index][keyword] += count
+    return keyword_counts, sum(token_counts.values())
+
+# Function to score one transcript held in memory, including keywords matched on the whole text
+def score_text(text, lookup, memo=None):
+    keyword_counts, total_words = score_words(text.split(), lookup, memo)
+    if lookup['patterns']:
+        cleaned_text = re.sub(r'\s+', ' ', text)
+        for index, patterns in lookup['patterns'].items():
+            for keyword, pattern in patterns.items():
+                count = len(pattern.findall(cleaned_text))
+                if count:
+                    keyword_counts[index][keyword] = count
+    return keyword_counts, total_words
+
+# Token memo of each worker process, kept across the transcripts it scores
+worker_memo = {}
+
+# Function to score one transcript in a worker, run by corpus_runner.run_corpus
+def score_file(transcript_file, text, lookup):
+    # Keep the per-worker token memo bounded on very large vocabularies
+    if len(worker_memo) > 1000000:
+        worker_memo.clear()
+    if lookup['patterns']:
+        if text is None:
+            with open(transcript_file, 'r', encoding='utf-8') as file:
+                text = file.read()
+        keyword_counts, total_words = score_text(text, lookup, worker_memo)
+    else:
+        keyword_counts, total_words = score_words(transcript_words(transcript_file, text), lookup, worker_memo)
+    return [dict(counts) for counts in keyword_counts], total_words
+
+# Function to turn the retained per-document counts into one score column per dictionary
+def finalize_scores(document_results, lookup):
+    filenames = sorted(document_results)
+    scores = {}
+    for index, dictionary in enumerate(lookup['dictionaries']):
+        column, measure = dictionary['column'], dictionary['measure']
+        if measure == 'tfidf':
+            document_counts = [(document_results[filename][0][index], document_results[filename][1]) for filename in filenames]
+            keywords = [keyword for keyword, indices in lookup['exact'].items() if index in indices]
+            counts, total_words, _ = build_matrix_from_counts(document_counts, keywords)
+            column_scores = calculate_exposures(counts, total_words, dictionary['unique_size'])
+        else:
+            totals = [sum(document_results[filename][0][index].values()) for filename in filenames]
+            if measure == 'equal_weighted':
+                column_scores = [total / dictionary['size'] if total else 0 for total in totals]
+            else:
+                column_scores = totals
+        scores[column] = dict(zip(filenames, column_scores))
+    return scores
+
+# Function to score every transcript in a directory against all dictionaries at once
+def score_corpus(directory_path, dictionaries, max_workers=None, chunk_size=8, metrics=None, prefetch_threads=None):
+    lookup = build_lookup(dictionaries)
+    document_results = run_corpus(directory_path, score_file, lookup, max_workers, chunk_size, metrics, prefetch_threads)
+    print(f"Scored {len(document_results)} transcripts against {len(dictionaries)} dictionaries")
+    return finalize_scores(document_results, lookup)
+
+# Main function to add every exposure and sentiment column to the panel in one corpus pass
+def main(directory_path, dictionary_files, input_excel, output_excel, max_workers=None, metrics_file=None, prefetch_threads=None):
+    metrics = new_metrics()
+    dictionaries = [(column, measure, load_keyword_list(path)) for column, measure, path in dictionary_files]
+    df = read_panel(input_excel)
+    scores = score_corpus(directory_path, dictionaries, max_workers, metrics=metrics, prefetch_threads=prefetch_threads)
+    write_score_columns(df, output_excel, scores, metrics, metrics_file)
+
+if __name__ == "__main__":
+    directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'
+    dictionary_files = [
+        ('cc_expo_ew', 'equal_weighted', r'/Users/mikiokilo/Downloads/general_unigrams.txt'),
+        ('op_expo_ew', 'equal_weighted', r'/Users/mikiokilo/Downloads/opportunity_unigrams.txt'),
+        ('rg_expo_ew', 'equal_weighted', r'/Users/mikiokilo/Downloads/regulatory_unigrams.txt'),
+        ('ph_expo_ew', 'equal_weighted', r'/Users/mikiokilo/Downloads/physical_unigrams.txt'),
+        ('cc_expo_tfidf', 'tfidf', r'/Users/mikiokilo/Downloads/general_unigrams.txt'),
+        ('risk_sentiment', 'equal_weighted', r'/Users/mikiokilo/Downloads/uncertainty_words.txt'),
+        ('positive_count', 'count', r'/Users/mikiokilo/Downloads/positive_words.csv'),
+        ('negative_count', 'count', r'/Users/mikiokilo/Downloads/negative_words.csv'),
+        ('risk_count', 'count', r'/Users/mikiokilo/Downloads/uncertainty_words.csv')
+    ]
+    input_excel = r'/Users/mikiokilo/Downloads/output_with_new_columns.xlsx'
+    output_excel = r'/Users/mikiokilo/Downloads/Final_Exposure_Outputs/all_scores.xlsx'
+
+    main(directory_path, dictionary_files, input_excel, output_excel)
@@ -0,0 +1,110 @@
+import os
+from collections import Counter
+from keyword_matcher import WORD_PATTERN
+from dta_pkl_reader import load_bigram_index
+from panel_store import read_panel
+from corpus_runner import run_corpus, transcript_words, write_score_columns
+from run_metrics import new_metrics
+
+# Every word that occurs in some n-gram gets an id from 1 up; every other word is 0.
+# The last n word ids of the stream, read as one base-(vocabulary size + 1) number, are then
+# an exact key for that window: a rolling update per word replaces building and hashing
+# word tuples, and no two different windows share a key.
+
+# Function to compile one or more n-gram indexes (as from dta_pkl_reader.build_ngram_index) into a matcher
+def build_ngram_matcher(ngram_indexes):
+    word_ids = {}
+    for ngram_index in ngram_indexes:
+        for ngrams in ngram_index.values():
+            for ngram in ngrams:
+                for word in ngram:
+                    word_ids.setdefault(word, len(word_ids) + 1)
+    base = len(word_ids) + 1
+    keys = {}
+    for index, ngram_index in enumerate(ngram_indexes):
+        for length, ngrams in ngram_index.items():
+            for ngram in ngrams:
+                code = 0
+                for word in ngram:
+                    code = code * base + word_ids[word]
+                keys.setdefault(length, {}).setdefault(code, []).append((index, ' '.join(ngram)))
+    lengths = sorted(keys)
+    return {
+        'word_ids': word_ids,
+        'base': base,
+        'windows': [(length, base ** length, keys[length]) for length in lengths],
+        'max_length': lengths[-1] if lengths else 0,
+        'num_lists': len(ngram_indexes)
+    }
+
+# Function to turn a transcript, streamed or already read, into the lowercase word stream n-grams are matched on
+def ngram_words(transcript_file, text=None):
+    for word in transcript_words(transcript_file, text):
+        yield from WORD_PATTERN.findall(word.lower())
+
+# Function to count every list's n-grams in a word stream in a single pass
+def count_ngrams(words, matcher):
+    word_ids = matcher['word_ids']
+    base = matcher['base']
+    windows = matcher['windows']
+    window_modulus = base ** matcher['max_length']
+    ngram_counts = [Counter() for _ in range(matcher['num_lists'])]
+    code = 0
+    total_words = 0
+    for word in words:
+        total_words += 1
+        word_id = word_ids.get(word, 0)
+        code = (code * base + word_id) % window_modulus
+        if not word_id:
+            # No n-gram ends in a word outside the vocabulary
+            continue
+        for length, modulus, keys in windows:
+            hits = keys.get(code % modulus)
+            if hits is not None:
+                for index, ngram in hits:
+                    ngram_counts[index][ngram] += 1
+    return ngram_counts, total_words
+
+# Function to calculate an n-gram exposure: hits of each length over that length's positions in the transcript
+def calculate_ngram_exposure(ngram_counts, total_words):
+    hits_by_length = Counter()
+    for ngram, count in ngram_counts.items():
+        hits_by_length[ngram.count(' ') + 1] += count
+    exposure = 0
+    for length, hits in hits_by_length.items():
+        positions = total_words - length + 1
+        if positions > 0:
+            exposure += hits / positions
+    return exposure
+
+# Function to count one transcript's n-grams in a worker, run by corpus_runner.run_corpus
+def score_file(transcript_file, text, matcher):
+    ngram_counts, total_words = count_ngrams(ngram_words(transcript_file, text), matcher)
+    return [calculate_ngram_exposure(counts, total_words) for counts in ngram_counts]
+
+# Function to score every transcript in a directory against all n-gram lists at once
+def score_ngram_corpus(directory_path, ngram_lists, max_workers=None, chunk_size=8, metrics=None, prefetch_threads=None):
+    matcher = build_ngram_matcher([ngram_index for _, ngram_index in ngram_lists])
+    results = run_corpus(directory_path, score_file, matcher, max_workers, chunk_size, metrics, prefetch_threads)
+    scores = {column: {filename: exposures[index] for filename, exposures in results.items()} for index, (column, _) in enumerate(ngram_lists)}
+    print(f"Scored {len(results)} transcripts against {len(ngram_lists)} n-gram lists")
+    return scores
+
+# Main function to add one n-gram exposure column per bigram pickle to the panel
+def main(directory_path, bigram_files, input_excel, output_excel, max_workers=None, metrics_file=None, prefetch_threads=None):
+    metrics = new_metrics()
+    ngram_lists = [(column, load_bigram_index(path)) for column, path in bigram_files]
+    df = read_panel(input_excel)
+    scores = score_ngram_corpus(directory_path, ngram_lists, max_workers, metrics=metrics, prefetch_threads=prefetch_threads)
+    write_score_columns(df, output_excel, scores, metrics, metrics_file)
+
+if __name__ == "__main__":
+    directory_path = r'/Users/mikiokilo/Downloads/pseudo_transcripts_txt'
+    bigram_dir = r'\\lancs\homes\47\aranyeok\My Documents\Replication Files Sautner et al. (2023)\B. Figure 1 2, Table 2, and IA Table 6 7 8 9 11\bigrams'
+    bigram_files = [
+        ('op_expo_bigram', os.path.join(bigram_dir, 'opportunity_bigrams_4.pkl'))
+    ]
+    input_excel = r'/Users/mikiokilo/Downloads/output_with_new_columns.xlsx'
+    output_excel = r'/Users/mikiokilo/Downloads/Final_Exposure_Outputs/bigram_scores.xlsx'
+
+    main(directory_path, bigram_files, input_excel, output_excel)
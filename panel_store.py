@@ -0,0 +1,158 @@
+import os
+import re
+import shutil
+import pandas as pd
+
+# A panel directory holds the firm-quarter table as Parquet instead of one Excel workbook:
+#   base/                   - the panel split into call_year=YYYY/call_quarter=Q/part.parquet, with a row_id column
+#   columns/<column>.parquet - one file per column added by a later stage, keyed by row_id
+# A stage that adds a column rewrites only that column's file.
+PERIOD_PATTERN = re.compile(r'Q([1-4])\s(\d{4})')
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_SHARE = 0.5
+
+# Function to derive the join key of a transcript from a file name or a full (Windows or POSIX) path
+def transcript_key(path):
+    return os.path.splitext(re.split(r'[\\/]', str(path))[-1])[0]
+
+# Function to attach file-keyed scores to the firm-quarter panel
+def join_scores(df, scores_by_file, column, key_column='file'):
+    if key_column in df.columns:
+        keyed_scores = {transcript_key(filename): score for filename, score in scores_by_file.items()}
+        df[column] = df[key_column].map(transcript_key).map(keyed_scores)
+        missing = df[column].isna().sum()
+        if missing:
+            raise ValueError(f"{missing} rows of the DataFrame have no matching transcript for {column}.")
+    else:
+        # Without a file column the rows follow the sorted transcript file names
+        if len(scores_by_file) != len(df):
+            raise ValueError("The number of exposures calculated does not match the number of rows in the DataFrame.")
+        df[column] = [scores_by_file[filename] for filename in sorted(scores_by_file)]
+    return df
+
+# Function to split 'Q3 2019' style earnings call periods into year and quarter columns
+def add_period_columns(df, period_column='earnings_call_period'):
+    if period_column in df.columns:
+        parts = df[period_column].astype(str).str.extract(PERIOD_PATTERN)
+        df['call_year'] = pd.to_numeric(parts[1], errors='coerce').astype('Int16')
+        df['call_quarter'] = pd.to_numeric(parts[0], errors='coerce').astype('Int8')
+    return df
+
+# Function to give the panel compact types: integer ids, categorical text, small period ints, and float32 for
+# the given score columns only; other float columns (e.g. financials) keep their full float64 precision
+def optimize_panel_dtypes(df, score_columns=()):
+    if 'company_id' in df.columns:
+        company_ids = pd.to_numeric(df['company_id'], errors='coerce')
+        df['company_id'] = company_ids.astype('Int32' if company_ids.max() < 2 ** 31 else 'Int64')
+    add_period_columns(df)
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+            if values.nunique() <= CATEGORY_MAX_SHARE * len(values):
+                df[column] = values.astype('category')
+        elif values.dtype == 'float64' and column in score_columns:
+            df[column] = values.astype('float32')
+        elif values.dtype == 'int64':
+            df[column] = pd.to_numeric(values, downcast='integer')
+    return df
+
+# Function to print the panel's memory use, largest columns first
+def memory_report(df, top=5):
+    usage = df.memory_usage(index=False, deep=True).sort_values(ascending=False)
+    largest = ', '.join(f"{column} {size / 2 ** 20:.1f} MB ({df[column].dtype})" for column, size in usage.head(top).items())
+    print(f"Panel: {len(df)} rows, {usage.sum() / 2 ** 20:.1f} MB in memory; largest columns: {largest}")
+    return usage
+
+# Function to prepare a panel for Excel: no derived key columns, float32 scores in their shortest decimal form
+def excel_frame(df):
+    df = df.drop(columns=['row_id', 'call_year', 'call_quarter'], errors='ignore')
+    for column in df.select_dtypes('float32').columns:
+        df[column] = df[column].astype(str).astype('float64')
+    return df
+
+# Function to tell a Parquet panel directory from an Excel workbook path; a panel directory
+# either exists already or, on its first write, has no file extension
+def is_panel_dir(path):
+    path = str(path)
+    if path.lower().endswith(('.xlsx', '.xls')):
+        return False
+    if os.path.isdir(path) or not os.path.splitext(path.rstrip('/\\'))[1]:
+        return True
+    raise ValueError(f"{path} is neither an Excel workbook (.xlsx, .xls) nor a panel directory.")
+
+# Function to write the whole panel as Parquet, one file per call year and quarter
+def save_panel(df, panel_dir, score_columns=()):
+    df = df.copy()
+    if 'row_id' not in df.columns:
+        df.insert(0, 'row_id', range(len(df)))
+    optimize_panel_dtypes(df, score_columns)
+    base_dir = os.path.join(panel_dir, 'base')
+    if os.path.isdir(base_dir):
+        shutil.rmtree(base_dir)
+    # Column files are keyed by the old row ids and would override the new base on load, so they go too
+    columns_dir = os.path.join(panel_dir, 'columns')
+    if os.path.isdir(columns_dir):
+        shutil.rmtree(columns_dir)
+    if 'call_year' in df.columns:
+        # The period columns stay inside each file; the directory names only route rows
+        partitions = df.groupby([df['call_year'].astype('string').fillna('unknown'), df['call_quarter'].astype('string').fillna('unknown')], sort=True)
+        for (year, quarter), partition in partitions:
+            partition_dir = os.path.join(base_dir, f"call_year={year}", f"call_quarter={quarter}")
+            os.makedirs(partition_dir, exist_ok=True)
+            partition.to_parquet(os.path.join(partition_dir, 'part.parquet'), index=False)
+    else:
+        os.makedirs(base_dir, exist_ok=True)
+        df.to_parquet(os.path.join(base_dir, 'part.parquet'), index=False)
+    print(f"Panel saved to {panel_dir}")
+
+# Function to read the panel back with every separately stored column joined on
+def load_panel(panel_dir, partitions=None):
+    base_dir = os.path.join(panel_dir, 'base')
+    part_files = []
+    for root, _, filenames in os.walk(base_dir):
+        if partitions is not None and os.path.relpath(root, base_dir).replace(os.sep, '/') not in partitions:
+            continue
+        part_files.extend(os.path.join(root, filename) for filename in filenames if filename.endswith('.parquet'))
+    df = pd.concat([pd.read_parquet(part_file) for part_file in sorted(part_files)], ignore_index=True)
+    df = df.sort_values('row_id').reset_index(drop=True)
+    columns_dir = os.path.join(panel_dir, 'columns')
+    if os.path.isdir(columns_dir):
+        for filename in sorted(os.listdir(columns_dir)):
+            if filename.endswith('.parquet'):
+                column_df = pd.read_parquet(os.path.join(columns_dir, filename))
+                column = column_df.columns[1]
+                df = df.drop(columns=[column], errors='ignore').merge(column_df, on='row_id', how='left')
+    return df
+
+# Function to store only the given columns of a panel that was read with load_panel
+def save_columns(df, panel_dir, columns):
+    columns_dir = os.path.join(panel_dir, 'columns')
+    os.makedirs(columns_dir, exist_ok=True)
+    for column in columns:
+        column_file = os.path.join(columns_dir, f"{column}.parquet")
+        tmp_file = column_file + '.tmp'
+        optimize_panel_dtypes(df[['row_id', column]].copy(), [column]).to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, column_file)
+    print(f"Columns {', '.join(columns)} saved to {panel_dir}")
+
+# Function to read the panel from an Excel workbook or a Parquet panel directory
+def read_panel(path):
+    df = load_panel(path) if is_panel_dir(path) else pd.read_excel(path)
+    optimize_panel_dtypes(df)
+    memory_report(df)
+    return df
+
+# Function to write a stage's new columns: only those columns for a panel directory, the whole workbook for Excel
+def write_panel_columns(df, path, columns):
+    if not is_panel_dir(path):
+        excel_frame(df).to_excel(path, index=False)
+    elif 'row_id' in df.columns and os.path.isdir(os.path.join(path, 'base')):
+        save_columns(df, path, columns)
+    else:
+        # First write of a panel that was read from Excel: store the whole table once
+        save_panel(df, path, columns)
+
+# Function to export a Parquet panel to Excel as an optional final step
+def export_excel(panel_dir, output_excel):
+    excel_frame(load_panel(panel_dir)).to_excel(output_excel, index=False)
+    print(f"Data saved to {output_excel}")
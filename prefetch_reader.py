@@ -0,0 +1,55 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Threads reading transcripts ahead of the scorers; reads release the GIL, so on a
+# high-latency share these overlap each other and the matching
+PREFETCH_THREADS = 8
+# Files read ahead at most, which bounds the memory held in prefetched buffers
+MAX_PREFETCHED = 32
+# Chunks handed to the CPU workers at most before waiting for one to finish
+MAX_PENDING_CHUNKS = 16
+
+# Function to read a whole transcript
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+# Function to read files on a bounded thread pool ahead of their consumer, yielding (path, content) in input order
+def prefetch_files(paths, threads=PREFETCH_THREADS, max_prefetched=MAX_PREFETCHED, reader=read_text):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(reader, path)))
+            if len(pending) >= max_prefetched:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+# Function to group an iterable into lists of chunk_size items
+def iter_chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Function to run fn over chunks on an executor with at most max_pending chunks submitted and unfinished.
+# Yields (result, pending) as chunks complete, where pending counts the chunks still in flight, so
+# the producer (e.g. prefetch_files) is only drawn from as fast as the workers keep up.
+def map_bounded(executor, fn, chunks, max_pending=MAX_PENDING_CHUNKS):
+    in_flight = set()
+    for chunk in chunks:
+        in_flight.add(executor.submit(fn, chunk))
+        if len(in_flight) >= max_pending:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result(), len(in_flight)
+    while in_flight:
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result(), len(in_flight)
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import heapq
+import cProfile
+from contextlib import contextmanager
+
+# Metrics of a run are one plain dict, so worker processes can return theirs with their results:
+#   stages      - per stage name: number of items and total seconds
+#   workers     - per worker pid: documents, words and seconds spent on them
+#   slowest     - heap of the SLOWEST_N slowest documents as [seconds, filename, words]
+#   queue_depth - futures still pending each time one completes: max, total and number of samples
+SLOWEST_N = 20
+# Seconds between the periodic summaries printed by report_progress
+SUMMARY_INTERVAL = 30.0
+
+# Function to start an empty set of metrics
+def new_metrics():
+    return {'started': time.time(), 'documents': 0, 'stages': {}, 'workers': {}, 'slowest': [], 'queue_depth': {'max': 0, 'total': 0, 'samples': 0}, 'last_report': time.time()}
+
+# Function to add time spent on a stage
+def add_stage(metrics, stage, seconds, count=1):
+    entry = metrics['stages'].setdefault(stage, {'count': 0, 'seconds': 0.0})
+    entry['count'] += count
+    entry['seconds'] += seconds
+
+# Context manager timing the enclosed block as one item of a stage
+@contextmanager
+def timed(metrics, stage, count=1):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(metrics, stage, time.perf_counter() - start, count)
+
+# Function to record one scored document for the per-worker throughput and the slowest-N list
+def record_document(metrics, filename, seconds, words=None, worker=None):
+    metrics['documents'] += 1
+    worker = str(os.getpid() if worker is None else worker)
+    entry = metrics['workers'].setdefault(worker, {'documents': 0, 'words': 0, 'seconds': 0.0})
+    entry['documents'] += 1
+    entry['words'] += words or 0
+    entry['seconds'] += seconds
+    item = [seconds, filename, words]
+    if len(metrics['slowest']) < SLOWEST_N:
+        heapq.heappush(metrics['slowest'], item)
+    elif item > metrics['slowest'][0]:
+        heapq.heapreplace(metrics['slowest'], item)
+
+# Function to record how many submitted futures were still pending
+def record_queue_depth(metrics, depth):
+    queue_depth = metrics['queue_depth']
+    queue_depth['max'] = max(queue_depth['max'], depth)
+    queue_depth['total'] += depth
+    queue_depth['samples'] += 1
+
+# Function to fold the metrics a worker returned into the run's metrics
+def merge_metrics(metrics, worker_metrics):
+    metrics['documents'] += worker_metrics['documents']
+    for stage, entry in worker_metrics['stages'].items():
+        add_stage(metrics, stage, entry['seconds'], entry['count'])
+    for worker, entry in worker_metrics['workers'].items():
+        total = metrics['workers'].setdefault(worker, {'documents': 0, 'words': 0, 'seconds': 0.0})
+        for key in total:
+            total[key] += entry[key]
+    for item in worker_metrics['slowest']:
+        if len(metrics['slowest']) < SLOWEST_N:
+            heapq.heappush(metrics['slowest'], item)
+        elif item > metrics['slowest'][0]:
+            heapq.heapreplace(metrics['slowest'], item)
+
+# Function to describe the run so far in one line
+def format_summary(metrics):
+    elapsed = time.time() - metrics['started']
+    stages = ', '.join(f"{stage} {entry['seconds']:.1f}s/{entry['count']}" for stage, entry in metrics['stages'].items())
+    queue_depth = metrics['queue_depth']
+    mean_depth = queue_depth['total'] / queue_depth['samples'] if queue_depth['samples'] else 0
+    return (f"{metrics['documents']} documents in {elapsed:.1f}s ({metrics['documents'] / max(elapsed, 1e-9):.1f} docs/s), "
+            f"{len(metrics['workers'])} workers, queue depth mean {mean_depth:.1f} max {queue_depth['max']}; stages: {stages}")
+
+# Function to print a summary when SUMMARY_INTERVAL has passed since the last one
+def report_progress(metrics, interval=SUMMARY_INTERVAL):
+    if time.time() - metrics['last_report'] >= interval:
+        metrics['last_report'] = time.time()
+        print(format_summary(metrics))
+
+# Function to write the metrics as JSON, with throughput per worker and the slowest documents first
+def write_metrics(metrics, metrics_file):
+    elapsed = time.time() - metrics['started']
+    workers = {worker: dict(entry, docs_per_sec=entry['documents'] / entry['seconds'] if entry['seconds'] else None) for worker, entry in metrics['workers'].items()}
+    slowest = [{'file': filename, 'seconds': seconds, 'words': words} for seconds, filename, words in sorted(metrics['slowest'], reverse=True)]
+    report = {'documents': metrics['documents'], 'elapsed_seconds': elapsed, 'docs_per_sec': metrics['documents'] / max(elapsed, 1e-9),
+              'stages': metrics['stages'], 'workers': workers, 'queue_depth': metrics['queue_depth'], 'slowest': slowest}
+    tmp_file = metrics_file + '.tmp'
+    with open(tmp_file, 'w') as file:
+        json.dump(report, file, indent=2)
+    os.replace(tmp_file, metrics_file)
+    print(f"Metrics written to {metrics_file}")
+
+# Profiler of this process, created on first use when profiling is switched on
+process_profiler = None
+
+# Context manager profiling the enclosed block with cProfile when profile_dir is given; each
+# process accumulates one profile and rewrites profile_dir/<name>-<pid>.prof after every block
+@contextmanager
+def profiled(profile_dir, name='worker'):
+    global process_profiler
+    if profile_dir is None:
+        yield
+        return
+    if process_profiler is None:
+        process_profiler = cProfile.Profile()
+    process_profiler.enable()
+    try:
+        yield
+    finally:
+        process_profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        process_profiler.dump_stats(os.path.join(profile_dir, f"{name}-{os.getpid()}.prof"))
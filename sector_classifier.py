@@ -0,0 +1,73 @@
+import re
+import pandas as pd
+from keyword_matcher import WORD_PATTERN
+
+# Function to compile a keyword -> sector map once; earlier keywords take priority
+def build_sector_classifier(keywords_to_sector):
+    words = {}
+    phrases = []
+    for priority, (keyword, sector) in enumerate(keywords_to_sector.items()):
+        keyword = keyword.upper()
+        if WORD_PATTERN.fullmatch(keyword):
+            # A single-word keyword matches r'\b<keyword>\b' exactly when it is a whole token
+            words.setdefault(keyword, (priority, sector))
+        else:
+            phrases.append((priority, keyword, sector))
+    phrase_pattern = None
+    if phrases:
+        # The lookahead reports a match at every position, so a higher-priority phrase
+        # starting inside a lower-priority one is still seen
+        alternation = '|'.join(re.escape(keyword) for _, keyword, _ in phrases)
+        phrase_pattern = re.compile(r'(?=\b(' + alternation + r')\b)')
+    return {
+        'words': words,
+        'phrases': {keyword: (priority, sector) for priority, keyword, sector in reversed(phrases)},
+        'phrase_pattern': phrase_pattern
+    }
+
+# Function to load a larger keyword taxonomy from a CSV with 'keyword' and 'sector' columns, in priority order
+def load_sector_keywords(csv_path):
+    taxonomy = pd.read_csv(csv_path, dtype=str).dropna(subset=['keyword', 'sector'])
+    return dict(zip(taxonomy['keyword'], taxonomy['sector']))
+
+# Function to find the sector of the highest-priority keyword in one company name
+def classify_name(company_name, classifier):
+    name = str(company_name).upper()
+    best = None
+    for token in WORD_PATTERN.findall(name):
+        hit = classifier['words'].get(token)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+    if classifier['phrase_pattern'] is not None:
+        for keyword in classifier['phrase_pattern'].findall(name):
+            hit = classifier['phrases'][keyword]
+            if best is None or hit[0] < best[0]:
+                best = hit
+    return best[1] if best is not None else None
+
+# Function to classify a column of company names, doing the work once per distinct name
+def classify_names(company_names, classifier):
+    unique_names = pd.unique(company_names)
+    sectors = {name: classify_name(name, classifier) for name in unique_names}
+    return company_names.map(sectors)
+
+# Function to fill a panel's sector column in one pass: known classifications of the same
+# company first, then the keyword classifier, with fill rates reported
+def resolve_sectors(df, classifier, column='LEVEL 2 SECTOR CLASSIFICATION', name_column='company_name'):
+    names = df[name_column].astype(str).astype('category')
+    sectors = df[column].astype(object)
+    known = sectors.notna()
+
+    # The first known classification of a company fills its other quarters
+    sectors = sectors.fillna(sectors.groupby(names, observed=True).transform('first'))
+    propagated = sectors.notna() & ~known
+
+    missing = sectors.isna()
+    sectors[missing] = classify_names(names[missing], classifier)
+    from_keywords = sectors.notna() & missing
+
+    df[name_column] = names
+    df[column] = sectors.astype('category')
+    print(f"Sectors for {len(df)} rows: {known.sum()} known, {propagated.sum()} from other quarters, "
+          f"{from_keywords.sum()} from keywords, {sectors.isna().sum()} unresolved ({sectors.notna().mean():.1%} filled)")
+    return df
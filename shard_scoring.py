@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import json
+import math
+import hashlib
+import subprocess
+import numpy as np
+from collections import Counter
+from keyword_matcher import count_matches, count_token_matches
+from transcript_reader import iter_words
+from checkpoint_journal import journal_key
+from dictionary_registry import load_dictionary
+from panel_store import join_scores, read_panel, write_panel_columns, transcript_key
+from tfidf_matrix import build_matrix_from_counts, weight_exposures
+
+# A shard run writes shard_dir/shard-<index>-of-<num_shards>.json holding:
+#   dictionary_version - hash of the keyword list, which every shard must share
+#   num_unigrams       - list length with repeats (equal-weighted denominator) and num_unique (TF-IDF denominator)
+#   files              - per transcript: exact whitespace-token keyword counts, total words and equal-weighted hits
+#   doc_freq           - the shard's partial keyword document frequencies
+# The merge adds the document frequencies up, so the IDF is the one a single run over all transcripts would use.
+
+# Function to assign a transcript to a shard from a stable hash of its key (file name or company id)
+def shard_of(key, num_shards):
+    return int(hashlib.sha1(str(key).encode('utf-8')).hexdigest(), 16) % num_shards
+
+# Function to map each transcript key to its company id, from a panel with 'file' and 'company_id' columns
+def load_company_ids(panel_path):
+    df = read_panel(panel_path)
+    return dict(zip(df['file'].map(transcript_key), df['company_id'].astype(str)))
+
+# Function to list the transcripts of one shard, optionally keeping every company's calls together
+def shard_files(directory_path, num_shards, shard_index, company_ids=None):
+    txt_files = sorted(filename for filename in os.listdir(directory_path) if filename.endswith('.txt'))
+    if company_ids is None:
+        return [filename for filename in txt_files if shard_of(filename, num_shards) == shard_index]
+    return [filename for filename in txt_files if shard_of(company_ids[transcript_key(filename)], num_shards) == shard_index]
+
+# Function to count one transcript for both measures in a single read
+def count_transcript(transcript_file, unigram_set, matcher):
+    token_counts = Counter(iter_words(transcript_file))
+    unigram_counts = {token: count for token, count in token_counts.items() if token in unigram_set}
+    if matcher['patterns']:
+        with open(transcript_file, 'r', encoding='utf-8') as file:
+            hits = sum(count_matches(re.sub(r'\s+', ' ', file.read()), matcher).values())
+    else:
+        hits = sum(count_token_matches(token_counts, matcher).values())
+    return {'counts': unigram_counts, 'total_words': sum(token_counts.values()), 'hits': hits}
+
+# Function to score one shard and write its partial counts and document frequencies
+def run_shard(directory_path, unigram_source, num_shards, shard_index, shard_dir, company_ids=None, dictionary_cache_dir=None):
+    # Shards share the compiled list from the dictionary cache rather than each compiling its own
+    dictionary = load_dictionary(unigram_source, dictionary_cache_dir)
+    unigrams = dictionary['unigrams']
+    unigram_set = dictionary['keywords']
+    matcher = dictionary['matcher']
+    files = {}
+    doc_freq = Counter()
+    for filename in shard_files(directory_path, num_shards, shard_index, company_ids):
+        files[filename] = count_transcript(os.path.join(directory_path, filename), unigram_set, matcher)
+        doc_freq.update(files[filename]['counts'].keys())
+
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_file = os.path.join(shard_dir, f"shard-{shard_index}-of-{num_shards}.json")
+    tmp_file = shard_file + '.tmp'
+    with open(tmp_file, 'w') as file:
+        json.dump({'dictionary_version': journal_key('shard', unigrams), 'num_shards': num_shards, 'shard_index': shard_index,
+                   'num_unigrams': len(unigrams), 'num_unique': len(unigram_set), 'files': files, 'doc_freq': doc_freq}, file)
+    os.replace(tmp_file, shard_file)
+    print(f"Shard {shard_index} of {num_shards}: {len(files)} transcripts written to {shard_file}")
+    return shard_file
+
+# Function to load every shard of a run, checking they belong together and none is missing
+def load_shards(shard_dir):
+    shards = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if filename.startswith('shard-') and filename.endswith('.json'):
+            with open(os.path.join(shard_dir, filename), 'r') as file:
+                shards.append(json.load(file))
+    if not shards:
+        raise ValueError(f"No shard files in {shard_dir}.")
+    num_shards = shards[0]['num_shards']
+    if {shard['dictionary_version'] for shard in shards} != {shards[0]['dictionary_version']} or {shard['num_shards'] for shard in shards} != {num_shards}:
+        raise ValueError(f"The shards in {shard_dir} come from different keyword lists or shard counts.")
+    missing = sorted(set(range(num_shards)) - {shard['shard_index'] for shard in shards})
+    if missing:
+        raise ValueError(f"Shards {missing} of {num_shards} are missing from {shard_dir}.")
+    return shards
+
+# Function to combine shards into global document frequencies and the final exposures of every transcript
+def merge_shards(shard_dir):
+    shards = load_shards(shard_dir)
+    files = {}
+    doc_freq = Counter()
+    for shard in shards:
+        overlap = files.keys() & shard['files'].keys()
+        if overlap:
+            raise ValueError(f"{len(overlap)} transcripts appear in more than one shard, e.g. {min(overlap)}.")
+        files.update(shard['files'])
+        doc_freq.update(shard['doc_freq'])
+
+    filenames = sorted(files)
+    N = len(filenames)
+    counts, total_words, keywords = build_matrix_from_counts([(files[filename]['counts'], files[filename]['total_words']) for filename in filenames], doc_freq.keys())
+    idf = np.array([math.log(N / doc_freq[keyword]) if doc_freq.get(keyword) else 0 for keyword in keywords])
+    tfidf_scores = dict(zip(filenames, weight_exposures(counts, total_words, idf, shards[0]['num_unique'])))
+    num_unigrams = shards[0]['num_unigrams']
+    ew_scores = {filename: files[filename]['hits'] / num_unigrams if files[filename]['hits'] else 0 for filename in filenames}
+    print(f"Merged {len(shards)} shards: {N} transcripts, {len(doc_freq)} keywords with a document frequency")
+    return ew_scores, tfidf_scores
+
+# Main function of the merge step: add both exposure columns to the panel
+def merge_main(shard_dir, input_excel, output_excel, ew_column='cc_expo_ew', tfidf_column='cc_expo_tfidf'):
+    ew_scores, tfidf_scores = merge_shards(shard_dir)
+    df = read_panel(input_excel)
+    join_scores(df, ew_scores, ew_column)
+    join_scores(df, tfidf_scores, tfidf_column)
+    write_panel_columns(df, output_excel, [ew_column, tfidf_column])
+    print(f"Data saved to {output_excel}")
+
+# Function to run every shard locally as a separate process, as independent jobs would
+def run_local(directory_path, unigram_source, num_shards, shard_dir, company_panel=None):
+    # Compile the list once up front so every shard process loads the ready index
+    load_dictionary(unigram_source, os.path.join(shard_dir, 'dictionary_cache'))
+    extra_args = [company_panel] if company_panel else []
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'shard', directory_path, unigram_source, str(num_shards), str(shard_index), shard_dir] + extra_args)
+                 for shard_index in range(num_shards)]
+    failed = [shard_index for shard_index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Shards {failed} failed.")
+
+if __name__ == "__main__":
+    # Usage:
+    #   python shard_scoring.py shard <transcripts_dir> <unigram_file_or_list_name> <num_shards> <shard_index> <shard_dir> [company_panel]
+    #   python shard_scoring.py merge <shard_dir> <input_panel> <output_panel> [ew_column] [tfidf_column]
+    #   python shard_scoring.py local <transcripts_dir> <unigram_file_or_list_name> <num_shards> <shard_dir> [company_panel]
+    # With a company panel, transcripts are partitioned by company id instead of file name
+    # Shards load the compiled keyword list from <shard_dir>/dictionary_cache, compiling it only if no shard has yet
+    command = sys.argv[1]
+    if command == 'shard':
+        company_ids = load_company_ids(sys.argv[7]) if len(sys.argv) > 7 else None
+        run_shard(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]), sys.argv[6], company_ids, os.path.join(sys.argv[6], 'dictionary_cache'))
+    elif command == 'merge':
+        merge_main(sys.argv[2], sys.argv[3], sys.argv[4], *sys.argv[5:7])
+    elif command == 'local':
+        run_local(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5], sys.argv[6] if len(sys.argv) > 6 else None)
+    else:
+        raise ValueError(f"Unknown command {command}, expected shard, merge or local.")
@@ -0,0 +1,48 @@
+import os
+import re
+import random
+from collections import Counter
+from keyword_matcher import build_matcher, count_matches, count_word_matches, count_unigrams_regex, load_zipped_unigrams
+
+ZIP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unigrams .zip')
+
+# Keywords with spaces or punctuation, which go through the per-keyword regex fallback
+PATTERN_KEYWORDS = ['wind farm', 'co2-emissions', "o'brien"]
+
+# Function to build a transcript mixing list keywords with punctuation, Unicode and irregular whitespace
+def synthetic_text(unigrams, seed=0):
+    rng = random.Random(seed)
+    keywords = rng.sample(sorted(set(unigrams)), min(200, len(set(unigrams))))
+    fillers = ['the', 'Café', 'naïve', 'über', '東京', 'co2', 'emissions', 'wind', 'farm', "o'brien", 'x_y', '42']
+    decorations = ['{}', '{},', '({})', '"{}"', '{}.', '{}—', '{}s', 're{}', '{}-{}', '{}_x', '«{}»', '{} {}', '{}/{}']
+    separators = [' ', '  ', '\t', '\n', ' \r\n ', ' ', ' ', ' - ']
+    words = []
+    for _ in range(1000):
+        word = rng.choice(keywords + fillers)
+        decoration = rng.choice(decorations)
+        words.append(decoration.format(word, rng.choice(keywords + fillers)))
+        words.append(rng.choice(separators))
+    words.append('wind farm, wind  farm; co2-emissions and O\'Brien or o\'brien.')
+    return ''.join(words)
+
+# Function to clean the text as the exposure scripts do
+def clean_text(text):
+    return re.sub(r'\s+', ' ', text)
+
+def test_count_matches_agrees_with_regex_on_shipped_lists():
+    for list_name, unigrams in load_zipped_unigrams(ZIP_PATH).items():
+        unigrams = unigrams + PATTERN_KEYWORDS
+        text = clean_text(synthetic_text(unigrams))
+        expected = +count_unigrams_regex(text, unigrams)
+        assert count_matches(text, build_matcher(unigrams)) == expected, list_name
+
+def test_count_word_matches_agrees_with_regex_on_shipped_lists():
+    for list_name, unigrams in load_zipped_unigrams(ZIP_PATH).items():
+        text = synthetic_text(unigrams)
+        expected = +count_unigrams_regex(clean_text(text), unigrams)
+        assert count_word_matches(text.split(), build_matcher(unigrams)) == expected, list_name
+
+def test_pattern_keywords_are_counted():
+    unigrams = ['flood'] + PATTERN_KEYWORDS
+    text = clean_text("A wind\tfarm near the flood plain; co2-emissions, o'brien and wind farms.")
+    assert count_matches(text, build_matcher(unigrams)) == Counter({'wind farm': 1, 'flood': 1, 'co2-emissions': 1, "o'brien": 1})
@@ -0,0 +1,59 @@
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+# Lowercased alphabetic words as Sentiment.py keeps them after nltk.word_tokenize:
+# a run of letters not glued to digits, underscores, hyphens, apostrophes or inner
+# periods (those Treebank tokens fail isalpha() and are dropped), optionally
+# followed by a clitic that Treebank splits off ("don't" -> "do", "firm's" -> "firm")
+FAST_TOKEN_PATTERN = re.compile(
+    r"(?<![\w'\-.])([^\W\d_]+)(?:(?i:n't)|'(?i:s|m|d|ll|re|ve))?(?=$|[^\w'\-.]|\.(?!\w))"
+)
+
+# Function to tokenize with one compiled pattern, no downloads, as a generator
+def tokenize_fast(text):
+    return (match.group(1).lower() for match in FAST_TOKEN_PATTERN.finditer(text))
+
+# Function to tokenize the way Sentiment.py always has, through NLTK
+def tokenize_nltk(text):
+    import nltk
+    tokens = nltk.word_tokenize(text)
+    tokens = [word.lower() for word in tokens]
+    tokens = [word for word in tokens if word.isalpha()]
+    return tokens
+
+# Function to compare the fast tokenizer with the NLTK path on a set of transcripts
+def agreement_benchmark(transcript_files):
+    nltk_seconds = fast_seconds = 0.0
+    nltk_total = fast_total = shared_total = 0
+    disagreements = Counter()
+    for transcript_file in transcript_files:
+        with open(transcript_file, 'r', encoding='utf-8') as file:
+            text = file.read()
+        start = time.perf_counter()
+        nltk_counts = Counter(tokenize_nltk(text))
+        nltk_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        fast_counts = Counter(tokenize_fast(text))
+        fast_seconds += time.perf_counter() - start
+        nltk_total += sum(nltk_counts.values())
+        fast_total += sum(fast_counts.values())
+        shared_total += sum((nltk_counts & fast_counts).values())
+        disagreements.update(nltk_counts - fast_counts)
+        disagreements.update(fast_counts - nltk_counts)
+    # Agreement is the share of tokens (as a multiset per document) both tokenizers produce
+    agreement = shared_total / max(nltk_total, fast_total, 1)
+    print(f"Transcripts: {len(transcript_files)}")
+    print(f"NLTK tokens: {nltk_total} in {nltk_seconds:.2f}s, fast tokens: {fast_total} in {fast_seconds:.2f}s")
+    print(f"Token agreement: {agreement:.4%}, speed-up: {nltk_seconds / max(fast_seconds, 1e-9):.1f}x")
+    print(f"Most frequent disagreements: {disagreements.most_common(20)}")
+    return agreement
+
+if __name__ == "__main__":
+    # Usage: python text_tokenizer.py <transcripts_dir> [max_files]
+    directory_path = sys.argv[1]
+    max_files = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    transcript_files = [os.path.join(directory_path, filename) for filename in sorted(os.listdir(directory_path)) if filename.endswith('.txt')][:max_files]
+    agreement_benchmark(transcript_files)
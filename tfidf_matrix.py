@@ -0,0 +1,82 @@
+import numpy as np
+from scipy import sparse
+from transcript_reader import iter_words
+
+# Function to build a document-by-keyword count matrix straight from transcript files
+def build_count_matrix(transcript_files, unigrams):
+    keywords = sorted(set(unigrams))
+    column_index = {unigram: column for column, unigram in enumerate(keywords)}
+    rows, columns = [], []
+    total_words = np.zeros(len(transcript_files), dtype=np.int64)
+    for row, transcript_file in enumerate(transcript_files):
+        for word in iter_words(transcript_file):
+            total_words[row] += 1
+            column = column_index.get(word)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+    data = np.ones(len(rows), dtype=np.int32)
+    # Duplicate (row, column) pairs are summed into counts by the CSR conversion
+    counts = sparse.csr_matrix((data, (rows, columns)), shape=(len(transcript_files), len(keywords)))
+    return counts, total_words, keywords
+
+# Function to build a document-by-keyword count matrix from per-document count dicts
+def build_matrix_from_counts(document_counts, unigrams):
+    keywords = sorted(set(unigrams))
+    column_index = {unigram: column for column, unigram in enumerate(keywords)}
+    rows, columns, data = [], [], []
+    total_words = np.zeros(len(document_counts), dtype=np.int64)
+    for row, (unigram_counts, words_in_document) in enumerate(document_counts):
+        total_words[row] = words_in_document
+        for unigram, count in unigram_counts.items():
+            rows.append(row)
+            columns.append(column_index[unigram])
+            data.append(count)
+    counts = sparse.csr_matrix((np.array(data, dtype=np.int32), (rows, columns)), shape=(len(document_counts), len(keywords)))
+    return counts, total_words, keywords
+
+# Function to build a document-by-vocabulary count matrix from the corpus cache
+def build_vocab_matrix(cache):
+    tokens = np.asarray(cache['tokens'])
+    offsets = cache['offsets']
+    total_words = np.diff(offsets)
+    rows = np.repeat(np.arange(len(total_words)), total_words)
+    data = np.ones(len(tokens), dtype=np.int32)
+    counts = sparse.csr_matrix((data, (rows, tokens)), shape=(len(total_words), len(cache['vocab'])))
+    return counts, total_words
+
+# Function to slice the keyword columns of a list out of a document-by-vocabulary matrix
+def select_keywords(vocab_counts, vocab, unigrams):
+    vocab_index = {token: token_id for token_id, token in enumerate(vocab)}
+    keywords = sorted(set(unigrams))
+    present = [(vocab_index[unigram], column) for column, unigram in enumerate(keywords) if unigram in vocab_index]
+    token_ids = [token_id for token_id, _ in present]
+    keyword_columns = [column for _, column in present]
+    # A 0/1 vocabulary-to-keyword selector turns the column slice into one sparse product
+    selector = sparse.csr_matrix(
+        (np.ones(len(present), dtype=vocab_counts.dtype), (token_ids, keyword_columns)),
+        shape=(vocab_counts.shape[1], len(keywords))
+    )
+    return sparse.csr_matrix(vocab_counts @ selector), keywords
+
+# Function to compute document frequency and IDF of every keyword column
+def calculate_idf_vector(counts):
+    N = counts.shape[0]
+    doc_count = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.zeros(counts.shape[1])
+    present = doc_count > 0
+    idf[present] = np.log(N / doc_count[present])
+    return doc_count, idf
+
+# Function to compute cc_expo_tfidf for every document with matrix operations
+def calculate_exposures(counts, total_words, num_unigrams):
+    _, idf = calculate_idf_vector(counts)
+    return weight_exposures(counts, total_words, idf, num_unigrams)
+
+# Function to apply an IDF vector computed elsewhere (e.g. over the full corpus) to some documents
+def weight_exposures(counts, total_words, idf, num_unigrams):
+    # Empty documents have no keyword counts, so dividing by 1 leaves their TF at 0
+    tf = sparse.diags(1.0 / np.maximum(total_words, 1)) @ counts
+    total_tfidf = tf @ idf
+    normalized_tfidf = total_tfidf / num_unigrams
+    return [round(float(value), 3) for value in normalized_tfidf]
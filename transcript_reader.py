@@ -0,0 +1,22 @@
+# Characters read per chunk; memory per open transcript stays around this size
+CHUNK_SIZE = 1 << 16
+
+# Function to stream the whitespace-separated words of a transcript in fixed-size chunks
+def iter_words(transcript_file, chunk_size=CHUNK_SIZE):
+    # Yields exactly clean_text(file.read()).split() without holding the whole file
+    carry = ''
+    with open(transcript_file, 'r', encoding='utf-8') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            words = chunk.split()
+            # A chunk that does not end in whitespace may have cut its last word in two
+            if words and not chunk[-1].isspace():
+                carry = words.pop()
+            else:
+                carry = ''
+            yield from words
+    if carry:
+        yield carry